@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控预警事件总线
+- 抓取器发布行情事件（quote.gold / quote.stock）
+- 检测器订阅行情，产出预警事件（金价转折点、股票预警规则）
+- 通知器合并、限流后通过可插拔的投递端发送（飞书 / 本地文件 / 内存队列）
+一个进程跑完所有监控，不再按条提醒启动子进程
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+# 事件主题
+QUOTE_GOLD = 'quote.gold'
+QUOTE_STOCK = 'quote.stock'
+ALERT = 'alert'
+
+OPENCLAW_BIN = "/root/.nvm/versions/node/v22.22.0/bin/openclaw"
+OPENCLAW_TARGET = "user:ou_5041a81ad3a5316a4b6f360e560cdc3f"
+
+LEVEL_EMOJI = {
+    'danger': "🔴",
+    'warning': "🟠",
+    'opportunity': "🟢",
+    'info': "🔵",
+}
+
+
+class EventBus:
+    """进程内同步事件总线"""
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+
+    def subscribe(self, topic, handler):
+        """订阅主题"""
+        self._handlers[topic].append(handler)
+
+    def publish(self, topic, payload):
+        """发布事件，单个订阅者出错不影响其他订阅者"""
+        for handler in list(self._handlers[topic]):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"事件处理失败 [{topic}]: {e}")
+
+
+# ==================== 抓取器 ====================
+
+class GoldFetcher:
+    """金价抓取：获取 AU9999 / 黄金ETF 并发布 quote.gold"""
+
+    def __init__(self, bus, monitor):
+        self.bus = bus
+        self.monitor = monitor
+
+    def poll(self):
+        self.monitor.now = datetime.now()
+        prices = self.monitor.get_all_prices()
+        if not prices:
+            print("❌ 未能获取金价数据")
+            return False
+        self.bus.publish(QUOTE_GOLD, prices)
+        return True
+
+
+class StockFetcher:
+    """股票抓取：交易时间内获取监控列表行情并发布 quote.stock"""
+
+    def __init__(self, bus, monitor):
+        self.bus = bus
+        self.monitor = monitor
+
+    def poll(self):
+        if not self.monitor.config.get('monitoring', {}).get('enabled', False):
+            return False
+        if not self.monitor.is_market_hours():
+            return False
+
+        codes = [s['code'] for s in self.monitor.config.get('watchlist', [])]
+        stock_data = self.monitor.get_realtime_quotes(codes)
+        if not stock_data or 'error' in stock_data:
+            print(f"❌ 股票数据获取失败: {stock_data.get('error', '无数据') if stock_data else '无数据'}")
+            return False
+        self.bus.publish(QUOTE_STOCK, stock_data)
+        return True
+
+
+# ==================== 检测器 ====================
+
+class GoldTurningPointDetector:
+    """金价转折点检测：更新历史后，峰顶转下滑/谷底转上升时发布预警"""
+
+    def __init__(self, bus, monitor):
+        self.bus = bus
+        self.monitor = monitor
+        bus.subscribe(QUOTE_GOLD, self.on_quote)
+
+    def on_quote(self, prices):
+        self.monitor.update_history(prices)
+        for alert in self.monitor.collect_turning_point_alerts(prices):
+            lines = self.monitor.format_alert_lines(alert)
+            self.bus.publish(ALERT, {
+                'source': 'gold',
+                'key': f"gold_{alert['symbol']}_{alert['type']}",
+                'level': 'warning' if alert['type'] == 'peak_to_decline' else 'opportunity',
+                'message': lines[0],
+                'details': lines[1:],
+                'time': self.monitor.now.isoformat(timespec='seconds'),
+            })
+
+
+class StockAlertDetector:
+    """股票预警规则检测：沿用 StockMonitor 的规则与防重复记录"""
+
+    def __init__(self, bus, monitor):
+        self.bus = bus
+        self.monitor = monitor
+        bus.subscribe(QUOTE_STOCK, self.on_quote)
+
+    def on_quote(self, stock_data):
+        for alert in self.monitor.collect_alerts(stock_data):
+            details = [f"   {alert['detail']}"]
+            if 'action' in alert:
+                details.append(f"   💡 建议: {alert['action']}")
+            self.bus.publish(ALERT, {
+                'source': 'stock',
+                'key': alert['key'],
+                'level': alert['level'],
+                'message': alert['message'],
+                'details': details,
+                'time': datetime.now().isoformat(timespec='seconds'),
+            })
+
+
+# ==================== 投递端 ====================
+
+class OpenClawSink:
+    """通过 openclaw 发送飞书消息（每批一次调用）"""
+
+    def __init__(self, target=OPENCLAW_TARGET, binary=OPENCLAW_BIN):
+        self.target = target
+        self.binary = binary
+
+    def send(self, text):
+        result = subprocess.run(
+            [self.binary, 'message', 'send', '-t', self.target, '--message', text],
+            capture_output=True, text=True, timeout=60
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"退出码 {result.returncode}")
+
+
+class FileSink:
+    """追加写入本地 JSONL 文件（调试 / 离线排队用）"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, text):
+        record = {'time': datetime.now().isoformat(timespec='seconds'), 'message': text}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class QueueSink:
+    """内存队列，测试时替代真实投递"""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, text):
+        self.messages.append(text)
+
+
+class StdoutSink:
+    """直接打印"""
+
+    def send(self, text):
+        print(text)
+
+
+def make_sink(spec):
+    """
+    根据描述创建投递端
+
+    Args:
+        spec: 'openclaw' | 'stdout' | 'queue' | 'file:/path/to/alerts.jsonl'
+    """
+    if spec == 'openclaw':
+        return OpenClawSink()
+    if spec == 'stdout':
+        return StdoutSink()
+    if spec == 'queue':
+        return QueueSink()
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    raise ValueError(f"未知的投递端: {spec}")
+
+
+# ==================== 通知器 ====================
+
+class Notifier:
+    """
+    预警通知器：合并多条预警为一条消息，并限制投递频率
+
+    Args:
+        bus: 事件总线
+        sink: 投递端（任何带 send(text) 方法的对象）
+        batch_size: 每条消息最多合并的预警数
+        min_interval: 两次投递之间的最小间隔（秒）
+    """
+
+    def __init__(self, bus, sink, batch_size=10, min_interval=30):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.pending = deque()
+        self.last_sent = 0.0
+        self.sent_count = 0
+        self._seen_keys = set()
+        bus.subscribe(ALERT, self.on_alert)
+
+    def on_alert(self, alert):
+        # 同一批次内相同 key 的预警只保留一条
+        if alert['key'] in self._seen_keys:
+            return
+        self._seen_keys.add(alert['key'])
+        self.pending.append(alert)
+
+    def format_batch(self, alerts):
+        lines = [
+            "╔" + "═" * 46 + "╗",
+            "║" + f"🚨 监控提醒 - {datetime.now().strftime('%H:%M')}".center(42) + "║",
+            "╚" + "═" * 46 + "╝",
+            ""
+        ]
+        for alert in alerts:
+            emoji = LEVEL_EMOJI.get(alert['level'], "🔵")
+            message = alert['message']
+            # 金价提醒自带 🔻/🔺 前缀，不再重复加等级标记
+            if alert['source'] != 'gold':
+                message = f"{emoji} {message}"
+            lines.append(message)
+            lines.extend(alert['details'])
+            lines.append("")
+        return "\n".join(lines)
+
+    def flush(self):
+        """发送一批预警；距上次投递不足 min_interval 时保留到下次"""
+        if not self.pending:
+            return 0
+        if time.time() - self.last_sent < self.min_interval:
+            return 0
+
+        batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+        try:
+            self.sink.send(self.format_batch(batch))
+        except Exception as e:
+            print(f"预警投递失败: {e}")
+            # 放回队首，下次重试
+            self.pending.extendleft(reversed(batch))
+            return 0
+
+        for alert in batch:
+            self._seen_keys.discard(alert['key'])
+        self.last_sent = time.time()
+        self.sent_count += len(batch)
+        return len(batch)
+
+    def drain(self, max_wait=None):
+        """按限流节奏发送全部待发预警（进程退出前调用）"""
+        deadline = None if max_wait is None else time.time() + max_wait
+        while self.pending:
+            if self.flush():
+                continue
+            wait = self.min_interval - (time.time() - self.last_sent)
+            if deadline is not None and time.time() + max(wait, 0) > deadline:
+                break
+            if wait > 0:
+                time.sleep(wait)
+            elif not self.flush():
+                # 投递失败，不在退出阶段反复重试
+                break
+        return len(self.pending)
+
+
+# ==================== 组装 ====================
+
+def build_pipeline(sink, gold=True, stock=True, batch_size=10, min_interval=30):
+    """
+    组装抓取器、检测器与通知器
+
+    Returns:
+        (bus, fetchers, notifier)
+    """
+    bus = EventBus()
+    fetchers = []
+
+    if gold:
+        from gold_monitor import GoldPriceMonitor
+        gold_monitor = GoldPriceMonitor('analysis')
+        GoldTurningPointDetector(bus, gold_monitor)
+        fetchers.append(GoldFetcher(bus, gold_monitor))
+
+    if stock:
+        from stock_monitor import StockMonitor
+        stock_monitor = StockMonitor()
+        StockAlertDetector(bus, stock_monitor)
+        fetchers.append(StockFetcher(bus, stock_monitor))
+
+    notifier = Notifier(bus, sink, batch_size=batch_size, min_interval=min_interval)
+    return bus, fetchers, notifier
+
+
+def run_once(fetchers, notifier):
+    """抓取一轮行情并发送产生的预警"""
+    for fetcher in fetchers:
+        fetcher.poll()
+    notifier.drain()
+    return notifier.sent_count
+
+
+def run_loop(fetchers, notifier, interval):
+    """常驻模式：每 interval 秒抓取一轮，期间按限流节奏投递"""
+    while True:
+        started = time.time()
+        for fetcher in fetchers:
+            fetcher.poll()
+        while time.time() - started < interval:
+            notifier.flush()
+            time.sleep(min(5, max(interval - (time.time() - started), 0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控预警事件总线")
+    parser.add_argument('--sink', default='openclaw',
+                        help="投递端: openclaw | stdout | file:PATH（默认 openclaw）")
+    parser.add_argument('--loop', type=int, default=0,
+                        help="常驻模式，每 N 秒抓取一轮（默认只跑一轮）")
+    parser.add_argument('--no-gold', action='store_true', help="不监控金价")
+    parser.add_argument('--no-stock', action='store_true', help="不监控股票")
+    parser.add_argument('--batch-size', type=int, default=10, help="每条消息最多合并的预警数")
+    parser.add_argument('--min-interval', type=int, default=30, help="两次投递的最小间隔（秒）")
+    args = parser.parse_args()
+
+    sink = make_sink(args.sink)
+    _, fetchers, notifier = build_pipeline(
+        sink, gold=not args.no_gold, stock=not args.no_stock,
+        batch_size=args.batch_size, min_interval=args.min_interval
+    )
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if args.loop > 0:
+        print(f"[{timestamp}] 预警总线常驻运行，间隔 {args.loop} 秒")
+        run_loop(fetchers, notifier, args.loop)
+    else:
+        sent = run_once(fetchers, notifier)
+        if sent:
+            print(f"[{timestamp}] 已发送 {sent} 条预警")
+        else:
+            print(f"[{timestamp}] 无预警信号，跳过发送")
+
+
+if __name__ == "__main__":
+    main()
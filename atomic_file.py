@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原子写文件 - 先写同目录的临时文件再改名，中途中断不会留下半个文件
+- 保留原文件的权限位；新文件按 0666 & ~umask 创建，与普通 open() 一致
+  （tempfile.mkstemp 建出的文件是 0600，直接改名会把原文件权限改掉）
+"""
+
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+
+def _new_file_mode():
+    """普通 open() 新建文件时的权限"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_write(path, binary=False, encoding='utf-8'):
+    """
+    原子写入 path，with 块正常结束才替换原文件，出错时删除临时文件
+
+    用法：
+        with atomic_write(path) as f:
+            f.write(text)
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = _new_file_mode()
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb' if binary else 'w', encoding=None if binary else encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path, data):
+    """原子写入紧凑 JSON"""
+    with atomic_write(path) as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
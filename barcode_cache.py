@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条码图片缓存 - 避免重复渲染
+- 以 (数据, 码制, 尺寸, 格式, 选项) 的哈希为键，记录在输出目录的清单文件中
+- 重复或增量运行时，只渲染清单中没有、设置变化或文件被改动过的条码
+- 文件改动按纳秒级 mtime + 大小判断（同一秒内重写的等长 PNG 也能识别）
+"""
+
+import hashlib
+import json
+import os
+
+from atomic_file import write_json_atomic
+
+MANIFEST_NAME = ".barcode_manifest.json"
+
+# 渲染实现变化时递增，使旧缓存全部失效
+RENDER_VERSION = 2
+
+
+def make_key(data, code_type='barcode', barcode_format='code128', size=(300, 150), fmt='png', options=None):
+    """计算缓存键（设置相同则键相同）"""
+    payload = json.dumps(
+        [RENDER_VERSION, str(data), code_type, barcode_format.lower(), list(size), fmt, options or {}],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class BarcodeCache:
+    """输出目录内的条码缓存清单"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}  # 文件名 -> 记录
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """加载清单（不存在或损坏时视为空缓存）"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == RENDER_VERSION:
+                self.entries = manifest.get('entries', {})
+        except (IOError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """有变更时原子写回清单"""
+        if not self._dirty:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        write_json_atomic(self.manifest_path, {'version': RENDER_VERSION, 'entries': self.entries})
+        self._dirty = False
+
+    def is_fresh(self, output_path, key):
+        """文件存在、键一致且自记录以来未被改动"""
+        entry = self.entries.get(os.path.basename(output_path))
+        if not entry or entry['key'] != key:
+            return False
+        try:
+            st = os.stat(output_path)
+        except OSError:
+            return False
+        return st.st_size == entry['bytes'] and st.st_mtime_ns == entry.get('mtime_ns')
+
+    def record(self, output_path, key, data, code_type='barcode', barcode_format='code128', size=(300, 150), fmt='png'):
+        """记录一个刚渲染好的文件"""
+        st = os.stat(output_path)
+        self.entries[os.path.basename(output_path)] = {
+            'key': key,
+            'data': str(data),
+            'code_type': code_type,
+            'barcode_format': barcode_format,
+            'size': list(size),
+            'fmt': fmt,
+            'bytes': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+        }
+        self._dirty = True
+
+
+if __name__ == "__main__":
+    import sys
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "."
+    cache = BarcodeCache(target)
+    print(f"清单: {cache.manifest_path}")
+    print(f"已缓存: {len(cache.entries)} 个")
+    for filename, entry in sorted(cache.entries.items())[:10]:
+        print(f"  {entry['data']} -> {filename}")
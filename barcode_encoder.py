@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条码直接编码器 - 不经过 PIL，直接输出条空宽度 / 模块矩阵
+- Code128 / Code39 / EAN13 → 条空游程（模块宽度序列，第一个为条）
+- QR Code → 模块矩阵（复用 qrcode 的编码与掩码，不生成图片）
+- 输出：紧凑 SVG（矢量，Word 可直接插入）或 1-bit PNG（纯 zlib 编码）
+"""
+
+import struct
+import zlib
+
+import qrcode
+
+# ==================== Code128 ====================
+
+# 值 0~106 对应的条空宽度（条、空交替，共 11 个模块；106 为终止符，13 个模块）
+CODE128_WIDTHS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+)
+
+CODE128_START = {'A': 103, 'B': 104, 'C': 105}
+CODE128_SWITCH = {'A': 101, 'B': 100, 'C': 99}
+CODE128_STOP = 106
+
+
+def _digit_run(data, i):
+    """从 i 开始的连续数字个数"""
+    j = i
+    while j < len(data) and data[j].isdigit():
+        j += 1
+    return j - i
+
+
+def _code128_set_for(char):
+    """非数字对字符选择 A（控制字符）或 B（可打印字符）"""
+    code = ord(char)
+    if code > 127:
+        raise ValueError(f"Code128 不支持字符: {char!r}")
+    return 'A' if code < 32 else 'B'
+
+
+def code128_values(data):
+    """
+    把数据编码为 Code128 码值序列（含起始符、校验符和终止符）
+    连续 4 个以上数字使用 C 字符集（两位一码），其余按需在 A/B 间切换
+    """
+    if not data:
+        raise ValueError("Code128 数据不能为空")
+
+    values = []
+    current = None
+    i = 0
+    while i < len(data):
+        run = _digit_run(data, i)
+        if run >= 4 or (current == 'C' and run >= 2):
+            if run % 2 and current != 'C':
+                # 奇数个数字：先用 A/B 编一位，剩下的偶数位用 C
+                wanted = _code128_set_for(data[i])
+            else:
+                wanted = 'C'
+        else:
+            wanted = _code128_set_for(data[i])
+            if current in ('A', 'B') and 32 <= ord(data[i]) < 96:
+                wanted = current  # A/B 共有的字符不必切换
+
+        if current is None:
+            values.append(CODE128_START[wanted])
+        elif wanted != current:
+            values.append(CODE128_SWITCH[wanted])
+        current = wanted
+
+        if current == 'C':
+            values.append(int(data[i:i + 2]))
+            i += 2
+        else:
+            code = ord(data[i])
+            values.append(code + 64 if code < 32 else code - 32)
+            i += 1
+
+    checksum = values[0] + sum(pos * value for pos, value in enumerate(values[1:], 1))
+    values.append(checksum % 103)
+    values.append(CODE128_STOP)
+    return values
+
+
+def encode_code128(data):
+    """Code128 条空游程"""
+    runs = []
+    for value in code128_values(data):
+        runs.extend(int(w) for w in CODE128_WIDTHS[value])
+    return runs
+
+
+# ==================== Code39 ====================
+
+# 9 个元素（条空交替，条开头），1 为宽元素
+CODE39_PATTERNS = {
+    '0': "000110100", '1': "100100001", '2': "001100001", '3': "101100000", '4': "000110001",
+    '5': "100110000", '6': "001110000", '7': "000100101", '8': "100100100", '9': "001100100",
+    'A': "100001001", 'B': "001001001", 'C': "101001000", 'D': "000011001", 'E': "100011000",
+    'F': "001011000", 'G': "000001101", 'H': "100001100", 'I': "001001100", 'J': "000011100",
+    'K': "100000011", 'L': "001000011", 'M': "101000010", 'N': "000010011", 'O': "100010010",
+    'P': "001010010", 'Q': "000000111", 'R': "100000110", 'S': "001000110", 'T': "000010110",
+    'U': "110000001", 'V': "011000001", 'W': "111000000", 'X': "010010001", 'Y': "110010000",
+    'Z': "011010000", '-': "010000101", '.': "110000100", ' ': "011000100", '$': "010101000",
+    '/': "010100010", '+': "010001010", '%': "000101010", '*': "010010100",
+}
+CODE39_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-. $/+%"
+
+
+def code39_checksum(data):
+    """Code39 模 43 校验字符"""
+    return CODE39_CHARS[sum(CODE39_CHARS.index(c) for c in data) % 43]
+
+
+def encode_code39(data, add_checksum=True, wide=3):
+    """
+    Code39 条空游程（字符间隔为 1 个窄空）
+
+    Args:
+        data: 内容（自动转大写）
+        add_checksum: 是否追加模 43 校验字符
+        wide: 宽元素与窄元素的比例
+    """
+    data = data.upper()
+    for char in data:
+        if char not in CODE39_CHARS:
+            raise ValueError(f"Code39 不支持字符: {char!r}")
+    if add_checksum:
+        data += code39_checksum(data)
+
+    runs = []
+    for char in f"*{data}*":
+        if runs:
+            runs.append(1)  # 字符间隔
+        runs.extend(wide if flag == '1' else 1 for flag in CODE39_PATTERNS[char])
+    return runs
+
+
+# ==================== EAN13 ====================
+
+EAN_L = ("0001101", "0011001", "0010011", "0111101", "0100011",
+         "0110001", "0101111", "0111011", "0110111", "0001011")
+EAN_R = tuple(''.join('1' if b == '0' else '0' for b in code) for code in EAN_L)
+EAN_G = tuple(code[::-1] for code in EAN_R)
+EAN_PARITY = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+              "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL")
+
+
+def ean13_checksum(digits):
+    """EAN13 校验位（前 12 位）"""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def ean13_fullcode(data):
+    """补齐或校验 EAN13 校验位，返回 13 位完整码"""
+    if not data.isdigit() or len(data) not in (12, 13):
+        raise ValueError(f"EAN13 需要 12 或 13 位数字，收到: {data!r}")
+    check = ean13_checksum(data)
+    if len(data) == 13 and data[12] != check:
+        raise ValueError(f"EAN13 校验位错误: {data}（应为 {check}）")
+    return data[:12] + check
+
+
+def encode_ean13(data):
+    """EAN13 条空游程（含起始、中间、终止保护符）"""
+    code = ean13_fullcode(data)
+    parity = EAN_PARITY[int(code[0])]
+
+    bits = "101"
+    for digit, kind in zip(code[1:7], parity):
+        bits += (EAN_L if kind == 'L' else EAN_G)[int(digit)]
+    bits += "01010"
+    for digit in code[7:]:
+        bits += EAN_R[int(digit)]
+    bits += "101"
+    return bits_to_runs(bits)
+
+
+# ==================== 通用 ====================
+
+ENCODERS = {
+    'code128': encode_code128,
+    'code39': encode_code39,
+    'ean13': encode_ean13,
+}
+
+
+def bits_to_runs(bits):
+    """'1110100' → [3, 1, 1, 2]（第一个必须是条）"""
+    if not bits or bits[0] != '1':
+        raise ValueError("模块序列必须以条开头")
+    runs = []
+    prev = None
+    for bit in bits:
+        if bit == prev:
+            runs[-1] += 1
+        else:
+            runs.append(1)
+            prev = bit
+    return runs
+
+
+def encode(data, symbology='code128'):
+    """
+    按码制编码为条空游程
+
+    Returns:
+        list[int]: 模块宽度序列，偶数下标为条，奇数下标为空
+    """
+    encoder = ENCODERS.get(symbology.lower())
+    if encoder is None:
+        raise ValueError(f"不支持的码制: {symbology}")
+    return encoder(str(data))
+
+
+def human_text(data, symbology='code128'):
+    """条码下方显示的文字（EAN13 带校验位）"""
+    if symbology.lower() == 'ean13':
+        return ean13_fullcode(str(data))
+    return str(data)
+
+
+def qr_matrix(data, error_correction=qrcode.constants.ERROR_CORRECT_H, border=4):
+    """
+    QR 模块矩阵（含静区），True 为深色模块
+    只做编码与掩码选择，不创建任何图片对象
+    """
+    qr = qrcode.QRCode(version=None, error_correction=error_correction, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _escape_xml(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def runs_to_svg(runs, size=(300, 150), quiet=10, text=None):
+    """
+    条空游程 → SVG 字符串
+
+    坐标以模块为单位，宽高按 size 像素缩放；所有条合并为一个 path
+    """
+    width, height = size
+    modules = sum(runs) + 2 * quiet
+    text_h = 0.16 * height if text else 0
+    bar_h = (height - text_h) * modules / width
+
+    path = []
+    x = quiet
+    for i, run in enumerate(runs):
+        if i % 2 == 0:
+            path.append(f"M{x} 0h{run}v{bar_h:.2f}h-{run}z")
+        x += run
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {modules} {height * modules / width:.2f}" shape-rendering="crispEdges">',
+        f'<rect width="100%" height="100%" fill="#fff"/>',
+        f'<path d="{"".join(path)}"/>',
+    ]
+    if text:
+        font = text_h * 0.85 * modules / width
+        parts.append(
+            f'<text x="{modules / 2:.2f}" y="{height * modules / width - font * 0.15:.2f}" '
+            f'font-family="monospace" font-size="{font:.2f}" text-anchor="middle">{_escape_xml(text)}</text>'
+        )
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def matrix_to_svg(matrix, size=300):
+    """QR 模块矩阵 → SVG 字符串（每行深色模块按游程合并）"""
+    n = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        f'<path d="{"".join(path)}"/></svg>'
+    )
+
+
+def _png_chunk(kind, payload):
+    chunk = kind + payload
+    return struct.pack('>I', len(payload)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def _pack_row(pixels):
+    """一行像素（True 为黑）→ 1-bit 灰度 PNG 行字节（0 为黑，1 为白）"""
+    bits = ''.join('0' if p else '1' for p in pixels)
+    bits += '1' * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, 'big')
+
+
+def encode_png_1bit(rows, width):
+    """
+    把若干行像素编码为 1-bit 灰度 PNG
+
+    Args:
+        rows: 可迭代的 (行像素, 重复次数)；相同行只打包一次
+        width: 图片宽度
+    """
+    raw = bytearray()
+    height = 0
+    for pixels, repeat in rows:
+        packed = b'\x00' + _pack_row(pixels)  # 过滤类型 0
+        raw += packed * repeat
+        height += repeat
+    header = struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(bytes(raw), 9)) + _png_chunk(b'IEND', b''))
+
+
+def runs_to_png(runs, size=(300, 150), quiet=10):
+    """
+    条空游程 → 1-bit PNG 字节（整数像素模块，不含文字）
+    所有行相同，只打包一行后重复
+    """
+    width, height = size
+    modules = sum(runs)
+    module_px = max(1, width // (modules + 2 * quiet))
+    if modules * module_px > width:
+        raise ValueError(f"目标宽度 {width}px 小于条码模块数 {modules}")
+
+    row = [False] * width
+    x = (width - modules * module_px) // 2
+    for i, run in enumerate(runs):
+        if i % 2 == 0:
+            row[x:x + run * module_px] = [True] * (run * module_px)
+        x += run * module_px
+    return encode_png_1bit([(row, height)], width)
+
+
+def matrix_to_png(matrix, size=300):
+    """QR 模块矩阵 → 1-bit PNG 字节（整数像素 box，居中补白）"""
+    n = len(matrix)
+    box = size // n
+    if box < 1:
+        raise ValueError(f"目标尺寸 {size}px 小于二维码模块数 {n}")
+    pad = (size - n * box) // 2
+    blank = [False] * size
+
+    rows = [(blank, pad)] if pad else []
+    for matrix_row in matrix:
+        pixels = [False] * pad
+        for dark in matrix_row:
+            pixels.extend([dark] * box)
+        pixels.extend([False] * (size - len(pixels)))
+        rows.append((pixels, box))
+    rows.append((blank, size - pad - n * box))
+    return encode_png_1bit(rows, size)
+
+
+def render_svg(data, code_type='barcode', barcode_format='code128', size=(300, 150), write_text=True):
+    """条码 / 二维码 → SVG 字符串"""
+    if code_type == 'barcode':
+        text = human_text(data, barcode_format) if write_text else None
+        return runs_to_svg(encode(data, barcode_format), size, text=text)
+    return matrix_to_svg(qr_matrix(data), size[0])
+
+
+def render_png(data, code_type='barcode', barcode_format='code128', size=(300, 150)):
+    """条码 / 二维码 → 1-bit PNG 字节（不含文字）"""
+    if code_type == 'barcode':
+        return runs_to_png(encode(data, barcode_format), size)
+    return matrix_to_png(qr_matrix(data), size[0])
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    sample = sys.argv[1] if len(sys.argv) > 1 else "SN:5504AJML26440001"
+    start = time.perf_counter()
+    for _ in range(1000):
+        svg = render_svg(sample)
+    svg_us = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(1000):
+        png = render_png(sample)
+    png_us = (time.perf_counter() - start) * 1000
+
+    print(f"数据: {sample}")
+    print(f"Code128 模块数: {sum(encode(sample))}")
+    print(f"SVG: {len(svg)} 字节，{svg_us:.1f} 微秒/个")
+    print(f"PNG: {len(png)} 字节，{png_us:.1f} 微秒/个")
@@ -3,13 +3,132 @@
 """
 条形码/二维码批量生成工具
 支持：Code128、Code39、EAN13、QR Code
+输出：PNG（带文字）、SVG 矢量、1-bit PNG（见 barcode_encoder）
 """
 
+import csv
+import io
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import groupby
 from barcode import Code128, Code39, EAN13
 from barcode.writer import ImageWriter
 import qrcode
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
+
+import barcode_encoder
+from barcode_cache import BarcodeCache, make_key
+
+BARCODE_CLASSES = {
+    'code128': Code128,
+    'code39': Code39,
+    'ean13': EAN13,
+}
+
+# 条码两侧静区至少保留的模块数
+MIN_QUIET_MODULES = 10
+
+@lru_cache(maxsize=16)
+def _barcode_font(font_px):
+    """条码下方文字字体（python-barcode 自带的 DejaVuSansMono）"""
+    return ImageFont.truetype(ImageWriter().font_path, font_px)
+
+def _check_fits(content_size, size, data):
+    """整数像素下内容放不进目标尺寸时报错，而不是缩放出不可扫描的图"""
+    if content_size[0] > size[0] or content_size[1] > size[1]:
+        raise ValueError(f"目标尺寸 {size[0]}x{size[1]} 放不下 [{data}]（至少需要 {content_size[0]}x{content_size[1]}）")
+
+def _fit_canvas(img, size):
+    """把已按整数像素渲染的 1-bit 图片放到目标尺寸画布中央（不重采样）"""
+    if img.size == tuple(size):
+        return img
+    canvas = Image.new('1', size, 1)
+    canvas.paste(img, ((size[0] - img.width) // 2, (size[1] - img.height) // 2))
+    return canvas
+
+def render_barcode_image(data, barcode_type='code128', size=(300, 150), write_text=True):
+    """
+    按目标尺寸直接渲染 1-bit 条形码图片（内存中完成，不缩放）
+    
+    先由 python-barcode 编码出模块序列，按目标宽度算出每个模块的整数像素宽，
+    多余宽度分给两侧静区，再用 PIL 一次画出所有条
+    
+    Args:
+        data: 条形码内容
+        barcode_type: 条形码类型 (code128, code39, ean13)
+        size: 图片尺寸 (宽, 高)
+        write_text: 是否在条码下方显示文字
+    
+    Returns:
+        PIL.Image（mode '1'，尺寸等于 size）
+    """
+    width, height = size
+    barcode_class = BARCODE_CLASSES.get(barcode_type.lower(), Code128)
+    barcode_obj = barcode_class(data)
+    pattern = barcode_obj.build()[0]
+    
+    modules = len(pattern)
+    module_px = max(1, width // (modules + 2 * MIN_QUIET_MODULES))
+    _check_fits((modules, 1), size, data)
+    x0 = (width - modules * module_px) // 2
+    
+    # 文字高度约为图片高度的 14%，上下各留 2 像素
+    font_px = max(8, round(height * 0.14)) if write_text else 0
+    margin = 2
+    bar_height = height - 2 * margin - (font_px + margin if write_text else 0)
+    if bar_height < 1:
+        raise ValueError(f"目标高度 {height}px 不足以容纳条码和文字 [{data}]")
+    
+    img = Image.new('1', size, 1)
+    draw = ImageDraw.Draw(img)
+    pos = 0
+    for bit, group in groupby(pattern):
+        run = len(list(group))
+        if bit == '1':
+            left = x0 + pos * module_px
+            draw.rectangle([left, margin, left + run * module_px - 1, margin + bar_height - 1], fill=0)
+        pos += run
+    
+    if write_text:
+        draw.text((width // 2, height - margin), barcode_obj.get_fullcode(),
+                  font=_barcode_font(font_px), fill=0, anchor='md')
+    return img
+
+def render_qr_image(data, size=300, error_correction=qrcode.constants.ERROR_CORRECT_H, border=4):
+    """
+    按目标尺寸直接渲染 1-bit 二维码图片
+    
+    先生成模块矩阵，再按目标像素求整数 box_size，避免先放大再 LANCZOS 缩小
+    
+    Returns:
+        PIL.Image（mode '1'，尺寸 size×size）
+    """
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=error_correction,
+        box_size=1,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    span = qr.modules_count + 2 * border
+    _check_fits((span, span), (size, size), data)
+    qr.box_size = size // span
+    img = qr.make_image(fill_color="black", back_color="white").get_image()
+    return _fit_canvas(img, (size, size))
+
+def image_to_bytes(img, fmt='PNG'):
+    """把图片编码为字节串（PNG 默认开启压缩优化）"""
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, optimize=(fmt.upper() == 'PNG'))
+    return buf.getvalue()
+
+def _save_barcode(data, output_path, barcode_type='code128', size=(300, 150)):
+    """生成条形码并保存（出错时抛出异常）"""
+    render_barcode_image(data, barcode_type, size).save(output_path)
 
 def generate_barcode(data, output_path, barcode_type='code128', size=(300, 150)):
     """
@@ -22,40 +141,16 @@ def generate_barcode(data, output_path, barcode_type='code128', size=(300, 150))
         size: 图片尺寸 (宽, 高)
     """
     try:
-        if barcode_type.lower() == 'code128':
-            barcode_class = Code128
-        elif barcode_type.lower() == 'code39':
-            barcode_class = Code39
-        elif barcode_type.lower() == 'ean13':
-            barcode_class = EAN13
-        else:
-            barcode_class = Code128
-        
-        # 生成条形码
-        barcode_obj = barcode_class(data, writer=ImageWriter())
-        
-        # 设置选项
-        options = {
-            'write_text': True,  # 显示文字
-            'module_height': 15,
-            'quiet_zone': 3,
-            'font_size': 12,
-        }
-        
-        # 保存
-        barcode_obj.save(output_path.replace('.png', ''), options=options)
-        
-        # 调整尺寸
-        if os.path.exists(output_path):
-            img = Image.open(output_path)
-            img = img.resize(size, Image.Resampling.LANCZOS)
-            img.save(output_path)
-        
+        _save_barcode(data, output_path, barcode_type, size)
         return True
     except Exception as e:
         print(f"生成条形码失败 [{data}]: {e}")
         return False
 
+def _save_qr(data, output_path, size=300, error_correction=qrcode.constants.ERROR_CORRECT_H):
+    """生成二维码并保存（出错时抛出异常）"""
+    render_qr_image(data, size, error_correction).save(output_path)
+
 def generate_qr(data, output_path, size=300, error_correction=qrcode.constants.ERROR_CORRECT_H):
     """
     生成二维码
@@ -67,26 +162,44 @@ def generate_qr(data, output_path, size=300, error_correction=qrcode.constants.E
         error_correction: 容错级别
     """
     try:
-        qr = qrcode.QRCode(
-            version=None,
-            error_correction=error_correction,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # 生成图片
-        img = qr.make_image(fill_color="black", back_color="white")
-        img = img.resize((size, size), Image.Resampling.LANCZOS)
-        img.save(output_path)
-        
+        _save_qr(data, output_path, size, error_correction)
         return True
     except Exception as e:
         print(f"生成二维码失败 [{data}]: {e}")
         return False
 
-def batch_generate_from_list(data_list, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150)):
+# 输出格式：png = PIL 渲染（带文字）；svg = 矢量；png1 = 直接编码的 1-bit PNG（不带文字，最快）
+OUTPUT_FORMATS = ('png', 'svg', 'png1')
+
+def output_path_for(data, output_dir, fmt='png'):
+    """数据对应的输出文件路径（'/' 和 ':' 替换为 '_'）"""
+    safe_data = str(data).replace('/', '_').replace(':', '_')
+    ext = 'svg' if fmt == 'svg' else 'png'
+    return os.path.join(output_dir, f"{safe_data}.{ext}")
+
+def save_code(data, output_path, code_type='barcode', barcode_format='code128', size=(300, 150), fmt='png'):
+    """
+    按输出格式生成单个条码/二维码（出错时抛出异常）
+    
+    Args:
+        fmt: 'png'（PIL 渲染，带文字）、'svg'（矢量）或 'png1'（直接编码 1-bit PNG）
+    """
+    if fmt == 'svg':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(barcode_encoder.render_svg(data, code_type, barcode_format, size))
+    elif fmt == 'png1':
+        with open(output_path, 'wb') as f:
+            f.write(barcode_encoder.render_png(data, code_type, barcode_format, size))
+    elif fmt == 'png':
+        if code_type == 'barcode':
+            _save_barcode(data, output_path, barcode_format, size)
+        else:
+            _save_qr(data, output_path, size[0])
+    else:
+        raise ValueError(f"不支持的输出格式: {fmt}（可选 {', '.join(OUTPUT_FORMATS)}）")
+
+def batch_generate_from_list(data_list, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150),
+                             fmt='png', use_cache=True):
     """
     根据列表批量生成
     
@@ -96,41 +209,247 @@ def batch_generate_from_list(data_list, output_dir, code_type='barcode', barcode
         code_type: 'barcode' 或 'qrcode'
         barcode_format: 条形码格式 (code128, code39, ean13)
         size: 图片尺寸
+        fmt: 输出格式 (png, svg, png1)
+        use_cache: 设置相同且文件未改动的条码直接复用（见 barcode_cache）
     """
     os.makedirs(output_dir, exist_ok=True)
+    cache = BarcodeCache(output_dir) if use_cache else None
     
+    label = '条形码' if code_type == 'barcode' else '二维码'
     success_count = 0
-    for i, data in enumerate(data_list, 1):
-        safe_data = str(data).replace('/', '_').replace(':', '_')
-        output_path = os.path.join(output_dir, f"{safe_data}.png")
-        
-        if code_type == 'barcode':
-            if generate_barcode(data, output_path, barcode_format, size):
-                success_count += 1
-                print(f"[{i}/{len(data_list)}] 条形码已生成: {data}")
-        else:
-            if generate_qr(data, output_path, size[0]):
-                success_count += 1
-                print(f"[{i}/{len(data_list)}] 二维码已生成: {data}")
+    reused = 0
+    try:
+        for i, data in enumerate(data_list, 1):
+            output_path = output_path_for(data, output_dir, fmt)
+            
+            if cache:
+                key = make_key(data, code_type, barcode_format, size, fmt)
+                if cache.is_fresh(output_path, key):
+                    success_count += 1
+                    reused += 1
+                    continue
+            
+            try:
+                save_code(data, output_path, code_type, barcode_format, size, fmt)
+            except Exception as e:
+                print(f"生成{label}失败 [{data}]: {e}")
+                continue
+            if cache:
+                cache.record(output_path, key, data, code_type, barcode_format, size, fmt)
+            success_count += 1
+            print(f"[{i}/{len(data_list)}] {label}已生成: {data}")
+    finally:
+        if cache:
+            cache.save()
     
-    print(f"\n完成！成功生成 {success_count}/{len(data_list)} 个")
+    print(f"\n完成！成功生成 {success_count}/{len(data_list)} 个" + (f"（复用缓存 {reused} 个）" if reused else ""))
     return success_count
 
-def generate_from_file(file_path, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150)):
+# ==================== 流式数据源 ====================
+
+def iter_sequence(prefix, start, end, width=None):
+    """
+    逐个产出序列号（不生成完整列表）
+    
+    Args:
+        prefix: 前缀（如 'SN:'）
+        start: 起始编号
+        end: 结束编号（包含）
+        width: 数字补零宽度（默认与 end 的位数相同）
+    """
+    width = len(str(end)) if width is None else width
+    for i in range(start, end + 1):
+        yield f"{prefix}{str(i).zfill(width)}"
+
+def iter_lines(file_path, encoding='utf-8'):
+    """逐行读取文件，跳过空行"""
+    with open(file_path, 'r', encoding=encoding) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def iter_csv_column(file_path, column=0, encoding='utf-8-sig', delimiter=','):
+    """
+    逐行读取 CSV 的某一列
+    
+    Args:
+        column: 列序号（int）或表头列名（str，首行视为表头）
+    """
+    with open(file_path, 'r', encoding=encoding, newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        if isinstance(column, str):
+            header = next(reader, [])
+            if column not in header:
+                raise ValueError(f"CSV 中没有列: {column}（表头: {header}）")
+            column = header.index(column)
+        for row in reader:
+            if len(row) > column and row[column].strip():
+                yield row[column].strip()
+
+# ==================== 多进程流水线 ====================
+
+def _render_task(task):
+    """进程池任务：渲染单个条码，返回 (序号, 数据, 错误信息或 None)"""
+    index, data, output_dir, code_type, barcode_format, size, fmt = task
+    try:
+        save_code(data, output_path_for(data, output_dir, fmt), code_type, barcode_format, size, fmt)
+        return index, data, None
+    except Exception as e:
+        return index, data, f"{type(e).__name__}: {e}"
+
+def _render_chunk(chunk):
+    """进程池任务：渲染一块条码，chunk = (output_dir, code_type, barcode_format, size, fmt, [(序号, 数据), ...])"""
+    output_dir, code_type, barcode_format, size, fmt, items = chunk
+    return [_render_task((index, data, output_dir, code_type, barcode_format, size, fmt)) for index, data in items]
+
+def stream_generate(source, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150),
+                    fmt='png', workers=None, chunksize=64, max_pending=None, progress_every=None,
+                    total=None, use_cache=False):
+    """
+    流式批量生成：从任意可迭代数据源边读边渲染
+    
+    数据按 chunksize 分块提交给进程池，同时在途的块不超过 max_pending，
+    队列满时先等最早的块完成再继续读取，因此内存占用与数据总量无关，
+    且第一块完成即开始输出；结果按提交顺序处理，进度保持有序
+    （开启 use_cache 时例外：缓存清单每个条码一条记录，内存和结束时的写回都随总数增长）
+    
+    Args:
+        source: 数据源（列表、iter_sequence / iter_lines / iter_csv_column 等生成器）
+        output_dir: 输出目录
+        code_type: 'barcode' 或 'qrcode'
+        barcode_format: 条形码格式 (code128, code39, ean13)
+        size: 图片尺寸
+        fmt: 输出格式 (png, svg, png1)
+        workers: 进程数（默认 CPU 核数）
+        chunksize: 每块条数
+        max_pending: 同时在途的块数上限（默认进程数的 4 倍）
+        progress_every: 每完成多少条打印一次进度（默认 total 的 1%，总数未知时每 1000 条）
+        total: 数据总数（仅用于显示进度，可不传）
+        use_cache: 设置相同且文件未改动的条码直接复用（见 barcode_cache）；
+                   清单占用 O(N) 内存，默认关闭
+    
+    Returns:
+        (成功数, 错误列表 [(序号, 数据, 错误信息), ...])
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache = BarcodeCache(output_dir) if use_cache else None
+    
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    if progress_every is None:
+        progress_every = max(1, total // 100) if total else 1000
+    
+    label = '条形码' if code_type == 'barcode' else '二维码'
+    keys = {}
+    errors = []
+    window = deque()
+    counts = {'done': 0, 'success': 0, 'reused': 0}
+    
+    def report(data):
+        counts['done'] += 1
+        if counts['done'] % progress_every == 0 or counts['done'] == total:
+            progress = f"{counts['done']}/{total}" if total else f"{counts['done']}"
+            print(f"[{progress}] {label}已处理: {data}")
+    
+    def collect_oldest():
+        for index, data, error in window.popleft().result():
+            key = keys.pop(index, None)
+            if error:
+                errors.append((index, data, error))
+            else:
+                counts['success'] += 1
+                if cache:
+                    cache.record(output_path_for(data, output_dir, fmt), key,
+                                 data, code_type, barcode_format, size, fmt)
+            report(data)
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = []
+            for index, data in enumerate(source, 1):
+                if cache:
+                    key = make_key(data, code_type, barcode_format, size, fmt)
+                    if cache.is_fresh(output_path_for(data, output_dir, fmt), key):
+                        counts['success'] += 1
+                        counts['reused'] += 1
+                        report(data)
+                        continue
+                    keys[index] = key
+                chunk.append((index, data))
+                if len(chunk) >= chunksize:
+                    window.append(pool.submit(_render_chunk, (output_dir, code_type, barcode_format, size, fmt, chunk)))
+                    chunk = []
+                    if len(window) >= max_pending:
+                        collect_oldest()
+            if chunk:
+                window.append(pool.submit(_render_chunk, (output_dir, code_type, barcode_format, size, fmt, chunk)))
+            while window:
+                collect_oldest()
+    finally:
+        if cache:
+            cache.save()
+    
+    for index, data, error in errors:
+        print(f"  第 {index} 条生成失败 [{data}]: {error}")
+    reused = f"，复用缓存 {counts['reused']} 个" if counts['reused'] else ""
+    print(f"\n完成！成功生成 {counts['success']}/{counts['done']} 个（{workers} 进程{reused}）")
+    return counts['success'], errors
+
+def batch_generate_parallel(data_list, output_dir, code_type='barcode', barcode_format='code128',
+                            size=(300, 150), workers=None, chunksize=None, progress_every=None, fmt='png',
+                            use_cache=True):
     """
-    从文件读取数据批量生成（每行一个）
+    多进程批量生成，data_list 按块分给各 CPU 核心
+    
+    Args:
+        data_list: 数据列表
+        output_dir: 输出目录
+        code_type: 'barcode' 或 'qrcode'
+        barcode_format: 条形码格式 (code128, code39, ean13)
+        size: 图片尺寸
+        workers: 进程数（默认 CPU 核数）
+        chunksize: 每块条数（默认按总量和进程数估算）
+        progress_every: 每完成多少条打印一次进度（默认约 1%）
+        fmt: 输出格式 (png, svg, png1)
+        use_cache: 设置相同且文件未改动的条码直接复用（见 barcode_cache）
+    
+    Returns:
+        (成功数, 错误列表 [(序号, 数据, 错误信息), ...])
+    """
+    total = len(data_list)
+    if total == 0:
+        print("数据为空，无需生成")
+        return 0, []
+    
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, min(256, total // (workers * 8)))
+    return stream_generate(data_list, output_dir, code_type, barcode_format, size, fmt=fmt,
+                           workers=workers, chunksize=chunksize, progress_every=progress_every,
+                           total=total, use_cache=use_cache)
+
+def generate_from_file(file_path, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150),
+                       column=None, workers=None, use_cache=False):
+    """
+    从文件读取数据批量生成（每行一个；传入 column 时按 CSV 读取该列）
+    边读边生成，不把整个文件读入内存；use_cache 见 stream_generate（开启后内存随条数增长）
     """
     if not os.path.exists(file_path):
         print(f"文件不存在: {file_path}")
         return
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data_list = [line.strip() for line in f if line.strip()]
+    if column is None:
+        source = iter_lines(file_path)
+    else:
+        source = iter_csv_column(file_path, column)
     
-    print(f"从文件读取到 {len(data_list)} 条数据")
-    batch_generate_from_list(data_list, output_dir, code_type, barcode_format, size)
+    print(f"从文件流式读取数据: {file_path}")
+    return stream_generate(source, output_dir, code_type, barcode_format, size, workers=workers,
+                           use_cache=use_cache)
 
-def generate_sequence(prefix, start, end, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150)):
+def generate_sequence(prefix, start, end, output_dir, code_type='barcode', barcode_format='code128', size=(300, 150),
+                      workers=None, use_cache=False):
     """
     生成序列号（如 SN001 ~ SN100）
     
@@ -139,9 +458,12 @@ def generate_sequence(prefix, start, end, output_dir, code_type='barcode', barco
         start: 起始编号
         end: 结束编号
         output_dir: 输出目录
+        workers: 进程数（默认 CPU 核数）
+        use_cache: 复用未改动的条码（见 stream_generate；清单占用 O(N) 内存，默认关闭）
     """
-    data_list = [f"{prefix}{str(i).zfill(len(str(end)))}" for i in range(start, end + 1)]
-    batch_generate_from_list(data_list, output_dir, code_type, barcode_format, size)
+    total = max(end - start + 1, 0)
+    return stream_generate(iter_sequence(prefix, start, end), output_dir, code_type, barcode_format, size,
+                           workers=workers, total=total, use_cache=use_cache)
 
 # ==================== 示例用法 ====================
 if __name__ == "__main__":
@@ -158,13 +480,21 @@ if __name__ == "__main__":
     # 示例3：从文件读取生成
     # generate_from_file("data.txt", "./output", code_type='barcode')
     
-    # 示例4：生成序列号（SN0001 ~ SN0340）
+    # 示例4：多进程批量生成（上万个 SN 时使用）
+    # data_list = [f"SN:5504AJML2644{i:04d}" for i in range(1, 10001)]
+    # success, errors = batch_generate_parallel(data_list, "./barcodes_output", code_type='barcode', size=(400, 200))
+    
+    # 示例5：生成序列号（SN0001 ~ SN0340）
     # generate_sequence("SN:", 55040001, 55040340, "./serial_barcodes", code_type='barcode', size=(400, 200))
     
     print("批量生成工具已加载")
     print("\n使用方法：")
     print("1. 从列表生成：batch_generate_from_list(data_list, output_dir, code_type='barcode')")
-    print("2. 从文件生成：generate_from_file('data.txt', output_dir)")
+    print("2. 从文件生成：generate_from_file('data.txt', output_dir) / generate_from_file('sn.csv', output_dir, column='SN')")
     print("3. 生成序列号：generate_sequence('SN:', 1, 100, output_dir)")
+    print("4. 内存渲染：render_barcode_image(data, size=(300, 150)) / render_qr_image(data, 300)")
+    print("5. 多进程生成：batch_generate_parallel(data_list, output_dir, workers=None)")
+    print("6. 流式生成：stream_generate(iter_sequence('SN:', 1, 1000000), output_dir)")
     print("\ncode_type: 'barcode' 或 'qrcode'")
+    print("fmt: 'png'（带文字）、'svg'（矢量）、'png1'（1-bit，最快）")
     print("barcode_format: 'code128', 'code39', 'ean13'")
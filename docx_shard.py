@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片并行生成 docx 正文
+- 把页面列表按页切成分片，进程池并行生成各分片的正文 XML（含读取、哈希图片）
+- 分片内图片先用占位符引用，主进程按顺序合并时统一登记图片、重新编号关系 ID 与形状 ID
+- 页码在切片前就已确定，每页都知道自己的全局序号和总页数，
+  "Carton NO. i / total"、"第 N 页 / 共 M 页" 等计数与单进程生成完全一致
+- 同时在途的分片数有上限，主进程内存占用与总页数无关
+"""
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from docx_stream import picture_run, probe_image, scaled_size
+
+SHAPE_TOKEN = '@@SHAPE@@'
+TOKEN_RE = re.compile(r'@@IMG(\d+)@@|<wp:docPr id="%s" name="Picture %s"/>' % (SHAPE_TOKEN, SHAPE_TOKEN))
+
+
+class ShardBody:
+    """
+    分片正文，接口同 StreamingDocx（write / picture），供页面函数在子进程中使用
+    """
+
+    def __init__(self):
+        self.images = []        # 分片内图片 [ImageInfo]
+        self._image_index = {}  # 绝对路径 -> 分片内序号
+        self._parts = []
+
+    def write(self, xml):
+        self._parts.append(xml)
+
+    def picture(self, image_path, width_cm=None, height_cm=None):
+        key = os.path.abspath(image_path)
+        k = self._image_index.get(key)
+        if k is None:
+            k = len(self.images)
+            self.images.append(probe_image(image_path))
+            self._image_index[key] = k
+        info = self.images[k]
+        cx, cy = scaled_size(info.cx, info.cy, width_cm, height_cm)
+        return picture_run(f'@@IMG{k}@@', info.filename, cx, cy, SHAPE_TOKEN)
+
+    def getvalue(self):
+        return ''.join(self._parts)
+
+
+def _render_shard(render_page, pages, total_pages, context):
+    """子进程：生成一个分片的正文与图片信息"""
+    body = ShardBody()
+    for page_number, items in pages:
+        render_page(body, page_number, total_pages, items, context)
+    return body.getvalue(), body.images
+
+
+def _merge_shard(out, xml, images):
+    """主进程：登记分片图片并替换占位符后写入"""
+    rids = [out.register(info)[0] for info in images]
+
+    def replace(m):
+        if m.group(1) is not None:
+            return rids[int(m.group(1))]
+        shape_id = out.new_shape_id()
+        return f'<wp:docPr id="{shape_id}" name="Picture {shape_id}"/>'
+
+    out.write(TOKEN_RE.sub(replace, xml))
+
+
+def write_pages(out, pages, render_page, context=None, workers=None, pages_per_shard=50, max_pending=None):
+    """
+    把所有页面写入 StreamingDocx
+
+    Args:
+        out: 已打开的 StreamingDocx
+        pages: 每页的内容列表 [items, ...]，页码按顺序从 1 开始
+        render_page: 模块级函数 render_page(body, page_number, total_pages, items, context)，
+                     用 body.write / body.picture 输出一页（包括页前的分页）
+        context: 传给 render_page 的公共参数（需可 pickle）
+        workers: 进程数，None / 1 为在当前进程内直接写入
+        pages_per_shard: 每个分片的页数
+        max_pending: 同时在途的分片数上限（默认 workers 的 2 倍）
+    """
+    total_pages = len(pages)
+    numbered = list(enumerate(pages, 1))
+
+    if not workers or workers <= 1:
+        for page_number, items in numbered:
+            render_page(out, page_number, total_pages, items, context)
+            if page_number % pages_per_shard == 0 or page_number == total_pages:
+                print(f"[{page_number}/{total_pages}] 页已写入")
+        return total_pages
+
+    shards = [numbered[i:i + pages_per_shard] for i in range(0, total_pages, pages_per_shard)]
+    max_pending = max_pending or workers * 2
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        shard_iter = iter(shards)
+        for shard in shard_iter:
+            pending.append((len(shard), executor.submit(_render_shard, render_page, shard, total_pages, context)))
+            if len(pending) >= max_pending:
+                break
+        while pending:
+            count, future = pending.popleft()
+            xml, images = future.result()
+            _merge_shard(out, xml, images)
+            done += count
+            print(f"[{done}/{total_pages}] 页已合并")
+            shard = next(shard_iter, None)
+            if shard is not None:
+                pending.append((len(shard), executor.submit(_render_shard, render_page, shard, total_pages, context)))
+    return total_pages
+
+
+def paginate(items, per_page):
+    """按每页数量切分"""
+    return [items[i:i + per_page] for i in range(0, len(items), per_page)]
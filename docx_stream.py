@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+docx 流式写入 - 不在内存中保留整个文档树
+- 以模板 docx（默认 python-docx 自带模板）为底稿，样式、页眉页脚、主题原样复制
+- 正文 document.xml 按页直接写入 zip，写完即释放
+- 表格片段见 docx_tables.table_xml
+- 图片只记录路径和尺寸，关闭时逐个从磁盘流式写入 zip，同一张图片只写一次
+- 内存占用与标签数量无关，两万个标签的文档也能在小内存机器上生成
+"""
+
+import os
+import posixpath
+import re
+import time
+import zipfile
+from collections import namedtuple
+from copy import deepcopy
+from xml.sax.saxutils import escape, quoteattr
+
+import docx
+from docx.image.image import Image
+from lxml import etree
+
+from docx_tables import cm_to_twips
+
+NS = {
+    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'wp': 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'pic': 'http://schemas.openxmlformats.org/drawingml/2006/picture',
+}
+PKG_RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+RT_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+RT_IMAGE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+RT_STYLES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx')
+EMU_PER_CM = 360000
+BODY_MARKER = '@@STREAM_BODY@@'
+FLUSH_BYTES = 256 * 1024
+
+
+def _w(tag):
+    return '{%s}%s' % (NS['w'], tag)
+
+
+# ==================== 正文片段 ====================
+
+def run(text='', bold=False, italic=False, size_pt=None):
+    """文字 run；换行符转为 w:br（同 python-docx 的 add_run）"""
+    props = ''
+    if bold:
+        props += '<w:b/>'
+    if italic:
+        props += '<w:i/>'
+    if size_pt:
+        props += f'<w:sz w:val="{int(size_pt * 2)}"/>'
+    parts = []
+    for i, line in enumerate(str(text).split('\n')):
+        if i:
+            parts.append('<w:br/>')
+        if line:
+            space = ' xml:space="preserve"' if line != line.strip() else ''
+            parts.append(f'<w:t{space}>{escape(line)}</w:t>')
+    return f"<w:r>{f'<w:rPr>{props}</w:rPr>' if props else ''}{''.join(parts)}</w:r>"
+
+
+def line_break():
+    """只含换行的 run（同 run.add_break()）"""
+    return '<w:r><w:br/></w:r>'
+
+
+def paragraph(*runs, align=None):
+    """
+    段落
+
+    Args:
+        runs: run() / StreamingDocx.picture() 生成的 run 片段，或纯文字
+        align: 'left' | 'center' | 'right' | None
+    """
+    body = ''.join(r if r.startswith('<') else run(r) for r in runs)
+    props = f'<w:pPr><w:jc w:val="{align}"/></w:pPr>' if align else ''
+    return f'<w:p>{props}{body}</w:p>'
+
+
+def page_break():
+    """只含分页符的段落（同 doc.add_page_break()）"""
+    return '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+# ==================== 图片 ====================
+
+ImageInfo = namedtuple('ImageInfo', 'source sha1 ext content_type filename cx cy')
+
+
+def probe_image(image):
+    """
+    读取图片的哈希、类型与原始尺寸（EMU）
+
+    Args:
+        image: 图片路径或图片字节；路径只记录绝对路径，数据在写入 zip 时再读
+    """
+    if isinstance(image, str):
+        info = Image.from_file(image)
+        source = os.path.abspath(image)
+    else:
+        info = Image.from_blob(bytes(image))
+        source = bytes(image)
+    return ImageInfo(source, info.sha1, info.ext, info.content_type, info.filename, info.width, info.height)
+
+
+def scaled_size(cx, cy, width_cm=None, height_cm=None):
+    """按给定宽 / 高缩放（只给一个时保持比例）"""
+    if width_cm is not None and height_cm is not None:
+        return int(width_cm * EMU_PER_CM), int(height_cm * EMU_PER_CM)
+    if width_cm is not None:
+        return int(width_cm * EMU_PER_CM), int(round(cy * width_cm * EMU_PER_CM / cx))
+    if height_cm is not None:
+        return int(round(cx * height_cm * EMU_PER_CM / cy)), int(height_cm * EMU_PER_CM)
+    return cx, cy
+
+
+def picture_run(rId, filename, cx, cy, shape_id):
+    """引用关系 rId 的内嵌图片 run（与 python-docx 生成的 wp:inline 相同）"""
+    return (
+        '<w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0">'
+        f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{shape_id}" name="Picture {shape_id}"/>'
+        '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name={quoteattr(filename)}/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{rId}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"/></pic:spPr></pic:pic>'
+        '</a:graphicData></a:graphic></wp:inline></w:drawing></w:r>'
+    )
+
+
+# ==================== 写入器 ====================
+
+class StreamingDocx:
+    """
+    流式 docx 写入器
+
+    用法：
+        with StreamingDocx(output_path, margins_cm=(1, 1.5, 1, 1.5)) as out:
+            out.write(paragraph(run("COLOUR：WHITE", bold=True)))
+            out.write(paragraph(out.picture(barcode_path, width_cm=6)))
+            out.write(page_break())
+
+    Args:
+        output_path: 输出 docx 路径
+        base_path: 底稿 docx（样式 / 页面设置 / 页眉页脚来源），默认 python-docx 模板；正文不复制
+        margins_cm: 页边距 (上, 右, 下, 左)，None 为沿用底稿
+        ensure_styles: 需保证存在的样式 ID，底稿没有时从默认模板补入
+    """
+
+    def __init__(self, output_path, base_path=None, margins_cm=None, ensure_styles=('TableGrid',)):
+        self.path = output_path
+        self.base_path = base_path or DEFAULT_TEMPLATE
+        self._base = zipfile.ZipFile(self.base_path)
+        names = set(self._base.namelist())
+
+        self.document_part = self._main_part_name()
+        doc_dir = posixpath.dirname(self.document_part)
+        self.rels_part = posixpath.join(doc_dir, '_rels', posixpath.basename(self.document_part) + '.rels')
+
+        self._rels = etree.fromstring(self._base.read(self.rels_part)) if self.rels_part in names \
+            else etree.Element('{%s}Relationships' % PKG_RELS_NS, nsmap={None: PKG_RELS_NS})
+        self._content_types = etree.fromstring(self._base.read('[Content_Types].xml'))
+        self._styles_part, self._styles = self._load_styles(doc_dir, ensure_styles)
+
+        self._used_rids = {rel.get('Id') for rel in self._rels}
+        self._next_rid_num = 1
+        self._used_media = {n for n in names if n.startswith(posixpath.join(doc_dir, 'media') + '/')}
+        self._next_image_num = 1
+        self._next_shape_id = self._max_shape_id(names) + 1
+        self._images_by_path = {}   # 绝对路径 -> 图片记录
+        self._images_by_sha1 = {}   # 内容哈希 -> 图片记录
+        self._media = []            # [(部件名, 路径或字节)]，关闭时写入
+        self._image_rels = []       # [(rId, 目标)]，关闭时写入关系部件
+
+        self._seed_base_images(doc_dir)
+
+        head, self._tail, self._sect_pr = self._document_shell(margins_cm)
+
+        self._zip = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+        skip = {self.document_part, self.rels_part, '[Content_Types].xml', self._styles_part}
+        for info in self._base.infolist():
+            if info.filename not in skip:
+                self._zip.writestr(info, self._base.read(info.filename))
+
+        info = zipfile.ZipInfo(self.document_part, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self._stream = self._zip.open(info, 'w', force_zip64=True)
+        self._buffer = [head]
+        self._buffered = len(head)
+        self.closed = False
+
+    # ---------- 底稿 ----------
+
+    def _main_part_name(self):
+        root = etree.fromstring(self._base.read('_rels/.rels'))
+        for rel in root:
+            if rel.get('Type') == RT_OFFICE_DOCUMENT:
+                return rel.get('Target').lstrip('/')
+        return 'word/document.xml'
+
+    def _load_styles(self, doc_dir, ensure_styles):
+        part = None
+        for rel in self._rels:
+            if rel.get('Type') == RT_STYLES:
+                part = posixpath.normpath(posixpath.join(doc_dir, rel.get('Target')))
+        if part is None:
+            return None, None
+        styles = etree.fromstring(self._base.read(part))
+
+        def find(root, style_id):
+            for s in root.iter(_w('style')):
+                if s.get(_w('styleId')) == style_id:
+                    return s
+            return None
+
+        missing = [sid for sid in ensure_styles if find(styles, sid) is None]
+        if missing:
+            with zipfile.ZipFile(DEFAULT_TEMPLATE) as default:
+                defaults = etree.fromstring(default.read('word/styles.xml'))
+            while missing:
+                style = find(defaults, missing.pop())
+                if style is None:
+                    continue
+                styles.append(deepcopy(style))
+                based_on = style.find(_w('basedOn'))
+                if based_on is not None and find(styles, based_on.get(_w('val'))) is None:
+                    missing.append(based_on.get(_w('val')))
+        return part, styles
+
+    def _seed_base_images(self, doc_dir):
+        """底稿里已有的图片也参与去重（同一张图片不再写第二份）"""
+        for rel in self._rels:
+            if rel.get('Type') != RT_IMAGE or rel.get('TargetMode') == 'External':
+                continue
+            try:
+                info = Image.from_blob(self._base.read(posixpath.normpath(posixpath.join(doc_dir, rel.get('Target')))))
+            except Exception:
+                continue
+            self._images_by_sha1.setdefault(info.sha1, (rel.get('Id'), info.filename, info.width, info.height))
+
+    def _max_shape_id(self, names):
+        """底稿中（页眉页脚等）已用的最大形状 ID"""
+        found = 0
+        for name in names:
+            if name.endswith('.xml') and name.startswith('word/'):
+                for m in re.finditer(rb'<wp:docPr\b[^>]*?\bid="(\d+)"', self._base.read(name)):
+                    found = max(found, int(m.group(1)))
+        return found
+
+    def _document_shell(self, margins_cm):
+        """生成 document.xml 的开头 / 结尾与 sectPr（沿用底稿的根元素命名空间和页面设置）"""
+        base_root = etree.fromstring(self._base.read(self.document_part))
+        nsmap = dict(base_root.nsmap)
+        for prefix, uri in NS.items():
+            if nsmap.get(prefix, uri) == uri:
+                nsmap[prefix] = uri
+        root = etree.Element(base_root.tag, attrib=dict(base_root.attrib), nsmap=nsmap)
+        etree.SubElement(root, _w('body')).text = BODY_MARKER
+        shell = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True).decode('utf-8')
+        head, tail = shell.split(BODY_MARKER)
+
+        sect_pr = base_root.find(_w('body') + '/' + _w('sectPr'))
+        if sect_pr is None:
+            sect_pr = etree.Element(_w('sectPr'))
+        if margins_cm:
+            pg_mar = sect_pr.find(_w('pgMar'))
+            if pg_mar is None:
+                pg_mar = etree.SubElement(sect_pr, _w('pgMar'))
+            for side, value in zip(('top', 'right', 'bottom', 'left'), margins_cm):
+                pg_mar.set(_w(side), str(cm_to_twips(value)))
+        return head, tail, self.serialize(sect_pr)
+
+    # ---------- 正文 ----------
+
+    @staticmethod
+    def serialize(element):
+        """把 lxml 元素（如 PageTemplate 的模板段落）转为可写入的片段"""
+        return etree.tostring(element, encoding='unicode')
+
+    def write(self, xml):
+        """追加正文片段（段落 / 表格 / 分页）"""
+        self._buffer.append(xml)
+        self._buffered += len(xml)
+        if self._buffered >= FLUSH_BYTES:
+            self._flush()
+
+    def write_element(self, element):
+        self.write(self.serialize(element))
+
+    def _flush(self):
+        self._stream.write(''.join(self._buffer).encode('utf-8'))
+        self._buffer = []
+        self._buffered = 0
+
+    # ---------- 图片 ----------
+
+    def _new_rid(self):
+        while f"rId{self._next_rid_num}" in self._used_rids:
+            self._next_rid_num += 1
+        rId = f"rId{self._next_rid_num}"
+        self._used_rids.add(rId)
+        return rId
+
+    def _new_partname(self, ext):
+        """新图片的部件名与相对正文的关系目标（media/imageN.ext）"""
+        doc_dir = posixpath.dirname(self.document_part)
+        while posixpath.join(doc_dir, f"media/image{self._next_image_num}.{ext}") in self._used_media:
+            self._next_image_num += 1
+        target = f"media/image{self._next_image_num}.{ext}"
+        name = posixpath.join(doc_dir, target)
+        self._used_media.add(name)
+        return name, target
+
+    def register(self, image):
+        """
+        登记图片（已登记的直接返回），只保留尺寸信息，图片数据在关闭时才从磁盘读取
+
+        Args:
+            image: 图片路径、图片字节，或 probe_image() 的结果
+
+        Returns:
+            (rId, 文件名, 宽, 高)，宽高为原始尺寸（EMU）
+        """
+        if isinstance(image, ImageInfo):
+            info = image
+        else:
+            key = os.path.abspath(image) if isinstance(image, str) else None
+            found = self._images_by_path.get(key)
+            if found:
+                return found
+            info = probe_image(image)
+
+        found = self._images_by_sha1.get(info.sha1)
+        if found is None:
+            partname, target = self._new_partname(info.ext)
+            rId = self._new_rid()
+            self._image_rels.append((rId, target))
+            self._ensure_content_type(info.ext, info.content_type)
+            self._media.append((partname, info.source))
+            found = (rId, info.filename, info.cx, info.cy)
+            self._images_by_sha1[info.sha1] = found
+        elif found[1] != info.filename:
+            # 内容相同的图片共用部件，图片名仍用各自的文件名（同 python-docx）
+            found = (found[0], info.filename, info.cx, info.cy)
+        if isinstance(info.source, str):
+            self._images_by_path[info.source] = found
+        return found
+
+    def _ensure_content_type(self, ext, content_type):
+        for node in self._content_types:
+            if node.get('Extension', '').lower() == ext.lower():
+                return
+        etree.SubElement(self._content_types, '{%s}Default' % CT_NS, Extension=ext, ContentType=content_type)
+
+    def new_shape_id(self):
+        shape_id = self._next_shape_id
+        self._next_shape_id += 1
+        return shape_id
+
+    def picture(self, image, width_cm=None, height_cm=None):
+        """图片 run 片段（只给宽或高时按比例缩放，同 run.add_picture）"""
+        rId, filename, cx, cy = self.register(image)
+        cx, cy = scaled_size(cx, cy, width_cm, height_cm)
+        return picture_run(rId, filename, cx, cy, self.new_shape_id())
+
+    # ---------- 收尾 ----------
+
+    def close(self):
+        """写入 sectPr、关系、内容类型与图片，完成 docx"""
+        if self.closed:
+            return
+        self.write(self._sect_pr + self._tail)
+        self._flush()
+        self._stream.close()
+
+        def dump(root):
+            return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+        # 图片关系可能有上万条，按文本逐条写入，不再建元素树
+        self._rels.append(etree.Comment(BODY_MARKER))
+        head, tail = dump(self._rels).split(b'<!--' + BODY_MARKER.encode() + b'-->')
+        with self._zip.open(self.rels_part, 'w', force_zip64=True) as f:
+            f.write(head)
+            for rId, target in self._image_rels:
+                f.write(f'<Relationship Id="{rId}" Type="{RT_IMAGE}" Target={quoteattr(target)}/>'.encode('utf-8'))
+            f.write(tail)
+        self._zip.writestr('[Content_Types].xml', dump(self._content_types))
+        if self._styles_part:
+            self._zip.writestr(self._styles_part, dump(self._styles))
+        # 图片本身已压缩，直接存储；按块从磁盘复制
+        for partname, source in self._media:
+            if isinstance(source, str):
+                self._zip.write(source, partname, compress_type=zipfile.ZIP_STORED)
+            else:
+                self._zip.writestr(partname, source, compress_type=zipfile.ZIP_STORED)
+        self._zip.close()
+        self._base.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 出错时不留下半个文档
+            self._stream.close()
+            self._zip.close()
+            self._base.close()
+            self.closed = True
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        return False
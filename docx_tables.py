@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+固定尺寸表格构建 - 行模板只生成一次
+- 列宽（w:tcW / w:gridCol）、行高（w:trHeight）写在一个行模板里，每行直接复制
+- 每个单元格只有一个 tcW、每行只有一个 trHeight，不再逐格追加重复属性
+- python-docx 文档用 add_table()，流式写入（docx_stream）用 table_xml()，两者生成相同的表格结构
+"""
+
+from copy import deepcopy
+from functools import lru_cache
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.table import Table
+
+
+def cm_to_twips(cm):
+    return int(round(cm * 1440 / 2.54))
+
+
+def table_parts(cols, col_width_cm, row_height_cm=None, style_id=None, align=None):
+    """
+    表格各部分的 XML 片段
+
+    Returns:
+        (表格开头（含 tblPr、tblGrid）, 行开头（含 trPr）, 单元格开头（含 tcPr）)
+    """
+    width = cm_to_twips(col_width_cm)
+    tbl_pr = f'<w:tblStyle w:val="{style_id}"/>' if style_id else ''
+    tbl_pr += '<w:tblW w:type="auto" w:w="0"/>'
+    if align:
+        tbl_pr += f'<w:jc w:val="{align}"/>'
+    tbl_pr += ('<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+               ' w:noHBand="0" w:noVBand="1" w:val="04A0"/>')
+    table_start = (f'<w:tbl><w:tblPr>{tbl_pr}</w:tblPr><w:tblGrid>'
+                   + f'<w:gridCol w:w="{width}"/>' * cols + '</w:tblGrid>')
+
+    row_start = '<w:tr>'
+    if row_height_cm:
+        row_start += f'<w:trPr><w:trHeight w:val="{cm_to_twips(row_height_cm)}" w:hRule="exact"/></w:trPr>'
+    cell_start = f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+    return table_start, row_start, cell_start
+
+
+def table_xml(rows, col_width_cm, row_height_cm=None, cols=None, style='TableGrid', align=None):
+    """
+    表格 XML 片段，每格宽 col_width_cm，行高固定为 row_height_cm
+
+    Args:
+        rows: [[单元格内容, ...], ...]，单元格内容为段落片段（None / '' 为空段落）
+        cols: 列数，默认取最长的一行；不足的单元格补空
+        style: 表格样式 ID
+        align: 表格对齐 'left' | 'center' | 'right' | None
+    """
+    if cols is None:
+        cols = max((len(r) for r in rows), default=0)
+    table_start, row_start, cell_start = table_parts(cols, col_width_cm, row_height_cm, style, align)
+
+    parts = [table_start]
+    for r in rows:
+        parts.append(row_start)
+        for c in range(cols):
+            content = r[c] if c < len(r) else None
+            parts.append(cell_start + (content or '<w:p/>') + '</w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def _templates(cols, col_width_cm, row_height_cm, align):
+    """解析一次的 (空表格, 行模板) 元素"""
+    table_start, row_start, cell_start = table_parts(cols, col_width_cm, row_height_cm, None, align)
+    tbl = parse_xml(table_start.replace('<w:tbl>', f'<w:tbl {nsdecls("w")}>', 1) + '</w:tbl>')
+    row = parse_xml(row_start.replace('<w:tr>', f'<w:tr {nsdecls("w")}>', 1)
+                    + (cell_start + '<w:p/></w:tc>') * cols + '</w:tr>')
+    return tbl, row
+
+
+def add_table(container, rows, cols, col_width_cm, row_height_cm=None, style='Table Grid', align=None):
+    """
+    在文档（或单元格）末尾添加固定尺寸表格，等同 add_table + 逐格 set_cell_size
+
+    Args:
+        container: python-docx Document / _Cell
+        style: 表格样式名（如 'Table Grid'），None 为不设置
+        align: 表格对齐 'left' | 'center' | 'right' | None
+
+    Returns:
+        docx.table.Table
+    """
+    tbl_template, row_template = _templates(cols, col_width_cm, row_height_cm, align)
+    tbl = deepcopy(tbl_template)
+    for _ in range(rows):
+        tbl.append(deepcopy(row_template))
+
+    block = getattr(container, '_body', container)
+    block._element._insert_tbl(tbl)
+    table = Table(tbl, block)
+    if style:
+        table.style = style
+    return table
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模板页克隆 - 直接复制 XML，不逐段逐 run 重建
+- 模板正文只解析一次，每页对元素子树 deepcopy 后只改占位文字
+- 段落/表格/run 的全部格式原样保留（字体、颜色、边框、合并单元格等）
+- 首次写入某个目标文档时，补齐目标缺少的样式，并把模板中的图片、外链关系映射过去
+"""
+
+import io
+import weakref
+from copy import deepcopy
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from docx_images import ImageRegistry
+
+W_P = qn('w:p')
+W_T = qn('w:t')
+W_TBL = qn('w:tbl')
+W_SECTPR = qn('w:sectPr')
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+
+def append_body_element(document, element):
+    """把元素追加到正文末尾（在 sectPr 之前，与 python-docx 的 add_paragraph 一致）"""
+    body = document.element.body
+    sect_pr = body.find(W_SECTPR)
+    if sect_pr is not None:
+        sect_pr.addprevious(element)
+    else:
+        body.append(element)
+    return element
+
+
+def page_break_paragraph():
+    """只含分页符的段落（等同 doc.add_page_break()）"""
+    p = OxmlElement('w:p')
+    r = OxmlElement('w:r')
+    br = OxmlElement('w:br')
+    br.set(qn('w:type'), 'page')
+    r.append(br)
+    p.append(r)
+    return p
+
+
+def set_text_of_paragraph(p, text):
+    """把段落文字整体替换为 text：写入第一个 w:t，其余 w:t 清空（保留第一个 run 的格式）"""
+    texts = list(p.iter(W_T))
+    if not texts:
+        return
+    texts[0].text = text
+    if text != text.strip():
+        texts[0].set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+    for t in texts[1:]:
+        t.text = ''
+
+
+class _Binding:
+    """模板元素在某个目标文档中的预处理副本（样式与关系已映射）"""
+
+    def __init__(self, elements):
+        self.elements = elements
+        self.paragraph_hits = {}   # marker -> [(元素序号, 段落序号)]
+
+
+class PageTemplate:
+    """
+    模板页
+
+    用法：
+        template = PageTemplate(template_path)                 # 整个正文
+        template = PageTemplate.from_paragraphs(path, 18)      # 只取前 18 个段落
+        doc = template.new_document()                          # 或任意已有 Document
+        template.append_to(doc, replacements={'{{SN}}': sn},
+                           line_patches={'Carton NO.': f'Carton NO. {i} / {n}'},
+                           page_break=i > 1)
+    """
+
+    def __init__(self, template_path, elements=None):
+        self.source_path = template_path
+        self.source = Document(template_path)
+        if elements is None:
+            elements = [el for el in self.source.element.body.iterchildren() if el.tag != W_SECTPR]
+        self.elements = elements
+        # 以目标文档的 DocumentPart 为键（弱引用；Document 本身不可哈希）：
+        # 文档被回收后记录随之消失，不会被复用同一 id 的新文档继承
+        self._bindings = weakref.WeakKeyDictionary()
+        self._same_package = weakref.WeakSet()   # 由 new_document() 创建、与模板共享样式和关系的文档
+
+    @classmethod
+    def from_paragraphs(cls, template_path, count=None, start=0):
+        """只取正文中第 start ~ start+count-1 个段落（跳过表格，同 doc.paragraphs 的编号；count 为 None 时取到末尾）"""
+        template = cls(template_path, elements=[])
+        paragraphs = [el for el in template.source.element.body.iterchildren() if el.tag == W_P]
+        template.elements = paragraphs[start:] if count is None else paragraphs[start:start + count]
+        return template
+
+    def new_document(self):
+        """
+        以模板文件为底稿创建空白文档：保留模板的样式、页面设置、页眉页脚，只清空正文
+        往这样的文档里克隆页面时无需映射样式和关系，输出与模板完全一致
+        """
+        doc = Document(self.source_path)
+        body = doc.element.body
+        for el in list(body.iterchildren()):
+            if el.tag != W_SECTPR:
+                body.remove(el)
+        self._same_package.add(doc.part)
+        return doc
+
+    # ---------- 绑定到目标文档 ----------
+
+    def _copy_missing_styles(self, target):
+        """把模板元素引用、而目标文档没有的样式（连同 basedOn 链）复制过去"""
+        source_styles = self.source.styles.element
+        target_styles = target.styles.element
+        pending = set()
+        for el in self.elements:
+            for tag in ('w:pStyle', 'w:rStyle', 'w:tblStyle'):
+                for node in el.iter(qn(tag)):
+                    pending.add(node.get(qn('w:val')))
+
+        while pending:
+            style_id = pending.pop()
+            if not style_id or target_styles.get_by_id(style_id) is not None:
+                continue
+            style = source_styles.get_by_id(style_id)
+            if style is None:
+                continue
+            target_styles.append(deepcopy(style))
+            for tag in ('w:basedOn', 'w:link', 'w:next'):
+                ref = style.find(qn(tag))
+                if ref is not None:
+                    pending.add(ref.get(qn('w:val')))
+
+    def _bind(self, target, registry):
+        """生成适用于 target 的元素副本：映射图片 / 外链关系 ID"""
+        binding = self._bindings.get(target.part)
+        if binding is not None:
+            return binding
+
+        same_package = target is self.source or target.part in self._same_package
+        if not same_package:
+            self._copy_missing_styles(target)
+            registry = registry or ImageRegistry(target)
+
+        source_rels = self.source.part.rels
+        rid_map = {}
+        elements = []
+        for el in self.elements:
+            el = deepcopy(el)
+            if not same_package:
+                for node in el.iter():
+                    for attr, rId in list(node.attrib.items()):
+                        if not attr.startswith('{%s}' % R_NS):
+                            continue
+                        if rId not in rid_map:
+                            rid_map[rId] = self._map_relationship(source_rels.get(rId), target, registry)
+                        if rid_map[rId] is None:
+                            del node.attrib[attr]
+                        else:
+                            node.set(attr, rid_map[rId])
+            elements.append(el)
+
+        binding = _Binding(elements)
+        self._bindings[target.part] = binding
+        return binding
+
+    @staticmethod
+    def _map_relationship(rel, target, registry):
+        if rel is None:
+            return None
+        if rel.is_external:
+            return target.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        if rel.reltype == RT.IMAGE:
+            return registry.register(io.BytesIO(rel.target_part.blob))[0]
+        return None
+
+    # ---------- 克隆 ----------
+
+    def _paragraph_indexes(self, binding, marker):
+        """含 marker 的段落位置 [(元素序号, 段落序号)]，每个 marker 只查找一次"""
+        hits = binding.paragraph_hits.get(marker)
+        if hits is None:
+            hits = []
+            for el_idx, el in enumerate(binding.elements):
+                paragraphs = [el] if el.tag == W_P else list(el.iter(W_P))
+                for p_idx, p in enumerate(paragraphs):
+                    if marker in ''.join(t.text or '' for t in p.iter(W_T)):
+                        hits.append((el_idx, p_idx))
+            binding.paragraph_hits[marker] = hits
+        return hits
+
+    def clone(self, target, replacements=None, line_patches=None, registry=None):
+        """
+        生成一页的元素副本（不插入文档）
+
+        Args:
+            target: 目标 Document
+            replacements: {占位文字: 新文字}，在每个 w:t 内替换
+            line_patches: {段落标记: 新段落文字}，含标记的段落整段替换
+            registry: 目标文档的 ImageRegistry（模板含图片时复用，可不传）
+        """
+        binding = self._bind(target, registry)
+        clones = [deepcopy(el) for el in binding.elements]
+
+        if replacements:
+            for el in clones:
+                for t in el.iter(W_T):
+                    text = t.text
+                    if not text:
+                        continue
+                    for old, new in replacements.items():
+                        if old in text:
+                            text = text.replace(old, str(new))
+                    t.text = text
+
+        if line_patches:
+            for marker, text in line_patches.items():
+                for el_idx, p_idx in self._paragraph_indexes(binding, marker):
+                    el = clones[el_idx]
+                    p = el if el.tag == W_P else list(el.iter(W_P))[p_idx]
+                    set_text_of_paragraph(p, text)
+
+        return clones
+
+    def append_to(self, target, replacements=None, line_patches=None, page_break=False, registry=None):
+        """
+        把一页追加到 target 正文末尾
+
+        Args:
+            page_break: 本页前是否分页（首元素为段落时设置 pageBreakBefore，否则插入分页段落）
+        """
+        clones = self.clone(target, replacements, line_patches, registry)
+        if page_break and clones:
+            first = clones[0]
+            if first.tag == W_P:
+                first.get_or_add_pPr().pageBreakBefore_val = True
+            else:
+                append_body_element(target, page_break_paragraph())
+        for el in clones:
+            append_body_element(target, el)
+        return clones
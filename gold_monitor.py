@@ -278,25 +278,16 @@ class GoldPriceMonitor:
 
         return "\n".join(lines)
 
-    def generate_analysis_report(self, prices):
-        """生成实时分析报告（只在转折点触发）"""
+    def collect_turning_point_alerts(self, prices):
+        """收集转折点提醒（峰顶转下滑/谷底转上升），不做格式化"""
         alerts = []
 
         for symbol, data in prices.items():
             trend, confidence = self.detect_trend_turning_point(symbol)
 
-            if trend == 'peak_to_decline':
-                alerts.append({
-                    'type': 'peak_to_decline',
-                    'symbol': symbol,
-                    'name': data['name'],
-                    'price': data['current'],
-                    'change_pct': data['change_pct'],
-                    'confidence': confidence
-                })
-            elif trend == 'valley_to_rise':
+            if trend in ('peak_to_decline', 'valley_to_rise'):
                 alerts.append({
-                    'type': 'valley_to_rise',
+                    'type': trend,
                     'symbol': symbol,
                     'name': data['name'],
                     'price': data['current'],
@@ -304,6 +295,28 @@ class GoldPriceMonitor:
                     'confidence': confidence
                 })
 
+        return alerts
+
+    @staticmethod
+    def format_alert_lines(alert):
+        """单条转折点提醒的文本行"""
+        if alert['type'] == 'peak_to_decline':
+            emoji = "🔻"
+            text = f"峰顶转下滑 (置信度: {alert['confidence']:.2f}%)"
+        else:
+            emoji = "🔺"
+            text = f"谷底转上升 (置信度: {alert['confidence']:.2f}%)"
+
+        return [
+            f"{emoji} {alert['name']}: {text}",
+            f"   当前价格: {alert['price']:.2f}",
+            f"   涨跌幅: {alert['change_pct']:+.2f}%",
+        ]
+
+    def generate_analysis_report(self, prices):
+        """生成实时分析报告（只在转折点触发）"""
+        alerts = self.collect_turning_point_alerts(prices)
+
         if not alerts:
             return None  # 没有转折点，不发送报告
 
@@ -315,16 +328,7 @@ class GoldPriceMonitor:
         ]
 
         for alert in alerts:
-            if alert['type'] == 'peak_to_decline':
-                emoji = "🔻"
-                text = f"峰顶转下滑 (置信度: {alert['confidence']:.2f}%)"
-            else:
-                emoji = "🔺"
-                text = f"谷底转上升 (置信度: {alert['confidence']:.2f}%)"
-
-            lines.append(f"{emoji} {alert['name']}: {text}")
-            lines.append(f"   当前价格: {alert['price']:.2f}")
-            lines.append(f"   涨跌幅: {alert['change_pct']:+.2f}%")
+            lines.extend(self.format_alert_lines(alert))
             lines.append("")
 
         return "\n".join(lines)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签任务基准测试 - 一个栈板标签任务到底花多久、时间花在哪
+- 按规模（默认 100 / 1k / 10k）生成一组虚拟 SN
+- 依次运行 batch_code_generator 出图和各 docx 版式（label_layout.LAYOUTS）
+- 每项任务在独立子进程中运行，记录耗时、峰值内存（RSS）、输出大小和分阶段耗时：
+  render（生成条码图 / 正文 XML）、image insert（登记图片：读取、哈希、测尺寸）、save（写入关系、图片并完成 zip）
+- 结果写入 JSON（默认 benchmarks/ 下按时间命名，不进 git），可用 --compare 与上一次结果逐项对比
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+SN_PREFIX = "SN:5504AJML"
+SN_START = 2644001
+DEFAULT_SIZES = (100, 1000, 10000)
+DOCX_JOBS = ('barcode_table', 'pallet_qrcode', 'pallet_label', 'image_barcode')
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+# ==================== 计时 ====================
+
+class StageTimer:
+    """
+    分阶段计时：在 with 块内给 StreamingDocx 的图片登记和收尾计时，
+    总耗时减去这两项即为 render（分片并行时图片在子进程中读取，计入 render）
+    """
+
+    def __init__(self):
+        self.stages = {'image_insert': 0.0, 'save': 0.0}
+        self._patched = []
+
+    def _wrap(self, cls, name, stage):
+        original = getattr(cls, name)
+        stages = self.stages
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stages[stage] += time.perf_counter() - started
+
+        setattr(cls, name, timed)
+        self._patched.append((cls, name, original))
+
+    def __enter__(self):
+        from docx_stream import StreamingDocx
+        self._wrap(StreamingDocx, 'register', 'image_insert')
+        self._wrap(StreamingDocx, 'close', 'save')
+        return self
+
+    def __exit__(self, *exc):
+        for cls, name, original in reversed(self._patched):
+            setattr(cls, name, original)
+        return False
+
+
+def _peak_rss_mb(include_children=False):
+    """本进程（及已结束子进程）的峰值 RSS，单位 MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / 1024, 1)
+
+
+def _dir_size(path):
+    with os.scandir(path) as it:
+        return sum(entry.stat().st_size for entry in it if entry.is_file())
+
+
+# ==================== 测试数据 ====================
+
+def make_template(path):
+    """栈板二维码版式用的模板：17 行标签信息 + 1 行横线"""
+    from docx import Document
+    from docx.shared import Pt
+
+    doc = Document()
+    lines = ["COLOUR：WHITE", "MODEL：HF-01", "SKU/ITEM：", "QTY：25", "G.W.:  KG"]
+    for i in range(17):
+        doc.add_paragraph().add_run(lines[i] if i < len(lines) else "").bold = True
+    rule = doc.add_paragraph().add_run("_" * 50)
+    rule.font.size = Pt(10)
+    doc.save(path)
+    return path
+
+
+def make_resource_image(path):
+    """image_barcode 版式的资源图片"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (800, 500), 'white')
+    ImageDraw.Draw(img).rectangle((40, 40, 760, 460), outline='black', width=12)
+    img.save(path)
+    return path
+
+
+# ==================== 任务（子进程内运行） ====================
+
+def _job_codes(count, work_dir, workers):
+    """batch_code_generator：生成 count 张条码图"""
+    from batch_code_generator import iter_sequence, stream_generate
+
+    out_dir = os.path.join(work_dir, f"barcodes_{count}")
+    started = time.perf_counter()
+    success, errors = stream_generate(iter_sequence(SN_PREFIX, SN_START, SN_START + count - 1), out_dir,
+                                      workers=workers, total=count, use_cache=False)
+    wall = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(f"{len(errors)} 个条码生成失败")
+    return {'wall_s': wall, 'stages': {'render': wall}, 'output_bytes': _dir_size(out_dir),
+            'peak_rss_mb': _peak_rss_mb(include_children=True)}
+
+
+def _job_docx(layout, count, work_dir, workers):
+    """按版式生成 docx（使用 _job_codes 生成的条码图）"""
+    from label_layout import LAYOUTS, build_document, load_items
+
+    items = load_items(os.path.join(work_dir, f"barcodes_{count}"))
+    output_path = os.path.join(work_dir, f"{layout}_{count}.docx")
+    with StageTimer() as timer:
+        started = time.perf_counter()
+        build_document(LAYOUTS[layout], items, output_path,
+                       template_path=os.path.join(work_dir, "template.docx"),
+                       fields={'resource_image': os.path.join(work_dir, "resource.png")}, workers=workers)
+        wall = time.perf_counter() - started
+    stages = dict(timer.stages)
+    stages['render'] = wall - stages['image_insert'] - stages['save']
+    return {'wall_s': wall, 'stages': stages, 'output_bytes': os.path.getsize(output_path),
+            'peak_rss_mb': _peak_rss_mb(include_children=bool(workers and workers > 1))}
+
+
+def _run_job(job, count, work_dir, workers):
+    """子进程入口：屏蔽任务本身的输出，只返回测量结果"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        if job == 'codes':
+            result = _job_codes(count, work_dir, workers)
+        else:
+            result = _job_docx(job, count, work_dir, workers)
+    result['wall_s'] = round(result['wall_s'], 3)
+    result['stages'] = {k: round(v, 3) for k, v in result['stages'].items()}
+    return result
+
+
+def run_job(job, count, work_dir, workers=None):
+    """在全新的子进程（spawn）中运行一项任务，峰值内存互不影响"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(_run_job, job, count, work_dir, workers).result()
+
+
+# ==================== 汇总 ====================
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, jobs=DOCX_JOBS, work_dir=None, workers=None, code_workers=None):
+    """
+    运行全部基准
+
+    Args:
+        sizes: SN 数量列表
+        jobs: 要测的 docx 版式（出图任务 codes 总是先运行）
+        work_dir: 中间文件目录（默认临时目录，结束后删除）
+        workers: docx 分片并行进程数（默认单进程）
+        code_workers: 出图进程数（默认 CPU 核数）
+
+    Returns:
+        结果 dict（可直接写成 JSON）
+    """
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workers': workers,
+        },
+        'results': [],
+    }
+
+    with contextlib.ExitStack() as stack:
+        if work_dir is None:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='label_bench_'))
+        os.makedirs(work_dir, exist_ok=True)
+        make_template(os.path.join(work_dir, "template.docx"))
+        make_resource_image(os.path.join(work_dir, "resource.png"))
+
+        for count in sizes:
+            for job in ('codes',) + tuple(jobs):
+                result = run_job(job, count, work_dir, code_workers if job == 'codes' else workers)
+                result = dict({'job': job, 'size': count}, **result)
+                report['results'].append(result)
+                stages = ', '.join(f"{k} {v:.2f}s" for k, v in result['stages'].items())
+                print(f"  {job:<14} {count:>6}  {result['wall_s']:>8.2f}s  {result['peak_rss_mb']:>7.1f} MB  "
+                      f"{result['output_bytes'] / 1024 / 1024:>8.2f} MB  ({stages})")
+    return report
+
+
+def compare(old, new):
+    """逐项对比两次结果（按 job + size 匹配），打印耗时与内存变化"""
+    previous = {(r['job'], r['size']): r for r in old['results']}
+    print(f"\n对比 {old['meta'].get('commit') or old['meta']['timestamp']} → "
+          f"{new['meta'].get('commit') or new['meta']['timestamp']}")
+    for r in new['results']:
+        before = previous.get((r['job'], r['size']))
+        if before is None:
+            print(f"  {r['job']:<14} {r['size']:>6}  （无旧数据）")
+            continue
+
+        def delta(key):
+            if not before[key]:
+                return "   n/a"
+            return f"{(r[key] - before[key]) / before[key] * 100:+6.1f}%"
+
+        print(f"  {r['job']:<14} {r['size']:>6}  耗时 {before['wall_s']:.2f}s → {r['wall_s']:.2f}s ({delta('wall_s')})  "
+              f"内存 {before['peak_rss_mb']:.1f} → {r['peak_rss_mb']:.1f} MB ({delta('peak_rss_mb')})  "
+              f"大小 {delta('output_bytes')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标签任务基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="SN 数量（默认 100 1000 10000）")
+    parser.add_argument('--jobs', nargs='+', default=list(DOCX_JOBS), choices=DOCX_JOBS, help="要测的 docx 版式")
+    parser.add_argument('--workers', type=int, help="docx 分片并行进程数（默认单进程）")
+    parser.add_argument('--code-workers', type=int, help="出图进程数（默认 CPU 核数）")
+    parser.add_argument('--work-dir', help="保留中间文件的目录（默认用临时目录）")
+    parser.add_argument('--output', help="结果 JSON 路径（默认 benchmarks/label_benchmark_<时间>.json）")
+    parser.add_argument('--compare', metavar='OLD_JSON', help="与之前的结果对比")
+    args = parser.parse_args()
+
+    print(f"{'任务':<14} {'数量':>6}  {'耗时':>9}  {'峰值内存':>9}  {'输出':>10}")
+    report = run_benchmarks(args.sizes, args.jobs, args.work_dir, args.workers, args.code_workers)
+
+    if not args.output:
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        args.output = os.path.join(BENCH_DIR, f"label_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签版式引擎 - 版式即配置
+- 每种标签文档用一份声明式版式描述：页边距、每页数量、页眉、网格（列数、单元格尺寸、单元格内容）、页脚、页间分隔、统计页
+- 分页在写入前一次算好，每页都知道自己的页码、总页数和本页 SN 区间
+- 所有版式共用同一条写入路径：StreamingDocx 流式落盘、docx_tables 行模板表格、docx_shard 分片并行
+- 版式是纯 dict，可写成 JSON 文件用 --spec 加载
+
+版式中的段落：
+    {'text': "Carton NO. {index} / {total}", 'bold': True, 'size_pt': 12, 'align': 'left'}
+    {'image': "{path}", 'width_cm': 5, 'align': 'center'}     # 图片不存在时整段省略
+    {'runs': [{'text': "{sn_tail}", 'size_pt': 8}, {'image': "{path}", 'width_cm': 2.2, 'newline': True}]}
+    {'template': 18}                                          # 模板文档的前 18 个段落/表格
+    {'template': None, 'patches': {'Carton NO.': "Carton NO. {index} / {total}"}}
+                                                              # 整个模板，含标记的段落整段改写
+    {}                                                        # 空段落
+文字中可用的字段：
+    页：page pages count first last；全局：total per_page cols 及版式 / 调用方给出的 fields
+    单个 SN：sn sn_tail path index
+"""
+
+import argparse
+import json
+import os
+from xml.sax.saxutils import escape
+
+from docx_shard import paginate, write_pages
+from docx_stream import StreamingDocx, line_break, page_break, paragraph, run
+from docx_tables import table_xml
+from docx_template import PageTemplate
+from sn_index import load_index
+
+MARGINS_CM = (1, 1.5, 1, 1.5)  # 上, 右, 下, 左
+# 模板段落中待改写文字的占位符（私用区字符，不会出现在正文里）
+PATCH_MARK = '\ue000'
+
+# ==================== 版式 ====================
+
+LAYOUTS = {
+    # create_barcode_doc：每页 3 行 2 列，单元格 6×7cm，资源图片在上、条形码在下
+    'image_barcode': {
+        'description': "资源图片 + 条形码，每页 3×2",
+        'margins_cm': MARGINS_CM,
+        'per_page': 6,
+        'grid': {
+            'cols': 2,
+            'cell_cm': (6, 7),
+            'cell': [{'runs': [{'image': "{resource_image}", 'width_cm': 5},
+                               {'image': "{path}", 'width_cm': 5, 'newline': True}],
+                      'align': 'center'}],
+        },
+        'fields': {'resource_image': ''},
+    },
+    # generate_barcode_tables：3 列，25 个一组，每组一页，最后一页为统计
+    'barcode_table': {
+        'description': "条形码表格，3 列 25 个一组",
+        'margins_cm': MARGINS_CM,
+        'per_page': 25,
+        'header': [{'text': "【第 {page} 组】", 'bold': True, 'size_pt': 12, 'align': 'left'}],
+        'grid': {
+            'cols': 3,
+            'cell_cm': (5.2, 2),
+            'align': 'left',
+            'fit_rows': True,
+            'cell': [{'image': "{path}", 'width_cm': 5, 'align': 'center'}],
+        },
+        'between': [{}, {}],
+        'summary': [{'text': "\n总计: {total} 个条形码", 'bold': True, 'size_pt': 14, 'align': 'center'},
+                    {'text': "分 {pages} 组，每组最多 {per_page} 个，{cols}列排列", 'size_pt': 11, 'align': 'center'}],
+    },
+    # generate_pallet_qrcode_doc：模板页眉（横线以上）+ 5×5 二维码，单元格 3×3cm
+    'pallet_qrcode': {
+        'description': "栈板二维码，模板页眉 + 每页 5×5",
+        'margins_cm': MARGINS_CM,
+        'base': 'template',
+        'per_page': 25,
+        'header': [{'template': 18}, {}],
+        'grid': {
+            'cols': 5,
+            'cell_cm': (3, 3),
+            'align': 'center',
+            'cell': [{'runs': [{'text': "{sn_tail}", 'size_pt': 8},
+                               {'image': "{path}", 'width_cm': 2.2, 'newline': True}],
+                      'align': 'center'}],
+        },
+        'footer': [{}, {'text': "第 {page} 页 / 共 {pages} 页 | 本页: {first}-{last}",
+                        'italic': True, 'size_pt': 9, 'align': 'center'}],
+    },
+    # generate_pallet_labels_from_template：整份模板一页，改写 S/N、箱号、数量所在段落，下方加条形码
+    'pallet_label_template': {
+        'description': "栈板标签（模板），每个 SN 一页",
+        'base': 'template',
+        'per_page': 1,
+        'item': [{'template': None,
+                  'patches': {'S/N(TOTAL):': "S/N(TOTAL): {sn}",
+                              'Carton NO.': "Carton NO. {index} / {total}",
+                              'QTY：': "QTY：{carton_qty}",
+                              'QTY:': "QTY：{carton_qty}"}},
+                 {'image': "{path}", 'width_cm': 6, 'align': 'left'}],
+        'fields': {'carton_qty': 25},
+    },
+    # generate_pallet_labels：每个 SN 一页
+    'pallet_label': {
+        'description': "栈板标签，每个 SN 一页",
+        'margins_cm': MARGINS_CM,
+        'per_page': 1,
+        'item': [{'text': "COLOUR：WHITE", 'bold': True},
+                 {'text': "MODEL：HF-01", 'bold': True},
+                 {'text': "SKU/ITEM：", 'bold': True},
+                 {'text': "QTY：{carton_qty}", 'bold': True},
+                 {'text': "G.W.:  KG", 'bold': True},
+                 {'text': "Carton NO. {index} / {total}", 'bold': True},
+                 {'text': "S/N(TOTAL): {sn}", 'bold': True},
+                 {'image': "{path}", 'width_cm': 6, 'align': 'left'},
+                 {'text': "MADE IN CHINA", 'bold': True}],
+        'between': [{'text': "_" * 50}],
+        'fields': {'carton_qty': 25},
+    },
+}
+
+
+def customize(spec, per_page=None, cols=None, **fields):
+    """
+    在已有版式上改每页数量、网格列数或默认字段，返回新版式（不修改原版式）
+    版式没有网格时设置列数抛出 ValueError
+    """
+    spec = dict(spec)
+    if per_page is not None:
+        spec['per_page'] = per_page
+    if cols is not None:
+        if 'grid' not in spec:
+            raise ValueError("该版式没有网格，不能设置列数")
+        spec['grid'] = dict(spec['grid'], cols=cols)
+    if fields:
+        spec['fields'] = dict(spec.get('fields', {}), **fields)
+    return spec
+
+
+# ==================== 分页 ====================
+
+def load_items(barcodes_dir):
+    """目录中的 SN 图片（按流水号排序）→ [(序号, SN, 路径), ...]"""
+    return [(i, item.sn, item.path) for i, item in enumerate(load_index(barcodes_dir), 1)]
+
+
+def plan_pages(spec, items):
+    """按版式的每页数量分页"""
+    return paginate(items, spec['per_page'])
+
+
+# ==================== 渲染 ====================
+
+def _run_xml(out, spec, fields):
+    """一个 run；图片不存在时返回 None"""
+    if 'image' in spec:
+        path = spec['image'].format_map(fields)
+        if not path or not os.path.exists(path):
+            return None
+        xml = out.picture(path, width_cm=spec.get('width_cm'), height_cm=spec.get('height_cm'))
+        return line_break() + xml if spec.get('newline') else xml
+    if spec.get('break'):
+        return line_break()
+    return run(spec.get('text', '').format_map(fields),
+               bold=spec.get('bold', False), italic=spec.get('italic', False), size_pt=spec.get('size_pt'))
+
+
+def _paragraph_xml(out, spec, fields, context):
+    """一个段落；只含图片且图片都不存在时返回 None"""
+    if 'template' in spec:
+        segments, texts = context['template_xml'][_template_key(spec)]
+        parts = [segments[0]]
+        for text, segment in zip(texts, segments[1:]):
+            parts.append(escape(text.format_map(fields)))
+            parts.append(segment)
+        return ''.join(parts)
+    if 'runs' in spec:
+        runs = spec['runs']
+    elif 'text' in spec or 'image' in spec or 'break' in spec:
+        runs = [spec]
+    else:
+        runs = []
+    parts = [xml for xml in (_run_xml(out, r, fields) for r in runs) if xml is not None]
+    if runs and not parts:
+        return None
+    return paragraph(*parts, align=spec.get('align'))
+
+
+def _blocks_xml(out, specs, fields, context):
+    return ''.join(xml for xml in (_paragraph_xml(out, s, fields, context) for s in specs) if xml is not None)
+
+
+def _item_fields(fields, item):
+    index, sn, path = item
+    return dict(fields, index=index, sn=sn, sn_tail=sn[-5:], path=path)
+
+
+def render_page(out, page_number, total_pages, items, context):
+    """按版式写入一页（out 为 StreamingDocx 或分片正文）"""
+    spec = context['spec']
+    fields = dict(context['fields'], page=page_number, pages=total_pages, count=len(items),
+                  first=items[0][0], last=items[-1][0])
+
+    # 页间分隔 + 分页（除了第一页）
+    if page_number > 1:
+        out.write(_blocks_xml(out, spec.get('between', ()), fields, context))
+        out.write(page_break())
+
+    out.write(_blocks_xml(out, spec.get('header', ()), fields, context))
+
+    grid = spec.get('grid')
+    if grid:
+        cols = grid['cols']
+        # fit_rows：行数随本页数量；否则按每页容量固定行数，多余单元格留空
+        rows = -(-(len(items) if grid.get('fit_rows') else spec['per_page']) // cols)
+        cells = [_blocks_xml(out, grid['cell'], _item_fields(fields, item), context) or None for item in items]
+        width_cm, height_cm = grid['cell_cm']
+        out.write(table_xml([cells[r * cols:(r + 1) * cols] for r in range(rows)], width_cm, height_cm, cols=cols,
+                            style=grid.get('style', 'TableGrid'), align=grid.get('align')))
+
+    for item in items:
+        out.write(_blocks_xml(out, spec.get('item', ()), _item_fields(fields, item), context))
+
+    out.write(_blocks_xml(out, spec.get('footer', ()), fields, context))
+
+
+def _template_key(block):
+    return block['template'], tuple(sorted((block.get('patches') or {}).items()))
+
+
+def _template_blocks(spec):
+    """版式中引用的模板块 {键: 块}"""
+    blocks = list(spec.get('header', ())) + list(spec.get('footer', ())) + list(spec.get('item', ()))
+    return {_template_key(b): b for b in blocks if 'template' in b}
+
+
+def _template_parts(template_path, block):
+    """
+    模板块 → (XML 片段, 改写文字)，每个块只解析、序列化一次
+    patches 命中的段落先写入占位符，渲染时在片段之间插入按字段格式化的文字
+    """
+    patches = block.get('patches') or {}
+    template = PageTemplate.from_paragraphs(template_path, block['template'])
+    marks = {marker: f'{PATCH_MARK}{i}{PATCH_MARK}' for i, marker in enumerate(patches)}
+    elements = template.clone(template.source, line_patches=marks)
+    pieces = ''.join(StreamingDocx.serialize(el) for el in elements).split(PATCH_MARK)
+    texts = list(patches.values())
+    return pieces[0::2], [texts[int(i)] for i in pieces[1::2]]
+
+
+def build_document(spec, items, output_path, template_path=None, fields=None, workers=None):
+    """
+    按版式生成文档
+
+    Args:
+        spec: 版式（LAYOUTS 中的一项或自定义 dict）
+        items: [(序号, SN, 图片路径), ...]，见 load_items()
+        template_path: 模板文档（版式含 {'template': ...} 段落或 base 为 'template' 时必需）
+        fields: 文字字段（覆盖版式的 fields）
+        workers: 并行进程数（默认单进程）
+
+    Returns:
+        页数（不含统计页）
+    """
+    blocks = _template_blocks(spec)
+    if (blocks or spec.get('base') == 'template') and not template_path:
+        raise ValueError("该版式需要模板文档 template_path")
+
+    # 模板段落只解析一次并序列化，每页直接写入
+    template_xml = {key: _template_parts(template_path, block) for key, block in blocks.items()}
+
+    pages = plan_pages(spec, items)
+    grid = spec.get('grid') or {}
+    context = {
+        'spec': spec,
+        'fields': dict(spec.get('fields', {}), **(fields or {}),
+                       total=len(items), per_page=spec['per_page'], cols=grid.get('cols', 1)),
+        'template_xml': template_xml,
+    }
+
+    base_path = template_path if spec.get('base') == 'template' else None
+    with StreamingDocx(output_path, base_path=base_path, margins_cm=spec.get('margins_cm')) as out:
+        write_pages(out, pages, render_page, context=context, workers=workers)
+
+        # 统计页
+        if spec.get('summary'):
+            out.write(page_break())
+            out.write(_blocks_xml(out, spec['summary'], dict(context['fields'], pages=len(pages)), context))
+    return len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按版式生成标签文档")
+    parser.add_argument('layout', help="版式名（" + "、".join(LAYOUTS) + "）或版式 JSON 文件")
+    parser.add_argument('barcodes_dir', help="SN 图片目录")
+    parser.add_argument('output', help="输出 docx 路径")
+    parser.add_argument('--template', help="模板文档")
+    parser.add_argument('--per-page', type=int, help="每页数量")
+    parser.add_argument('--cols', type=int, help="网格列数")
+    parser.add_argument('--field', action='append', default=[], metavar='KEY=VALUE', help="文字字段，可重复")
+    parser.add_argument('--workers', type=int, help="并行进程数")
+    args = parser.parse_args()
+
+    if args.layout in LAYOUTS:
+        spec = LAYOUTS[args.layout]
+    else:
+        with open(args.layout, encoding='utf-8') as f:
+            spec = json.load(f)
+    fields = dict(item.split('=', 1) for item in args.field)
+    try:
+        spec = customize(spec, per_page=args.per_page, cols=args.cols)
+    except ValueError as e:
+        parser.error(str(e))
+
+    items = load_items(args.barcodes_dir)
+    print(f"找到 {len(items)} 个条形码")
+    pages = build_document(spec, items, args.output, template_path=args.template, fields=fields, workers=args.workers)
+    print(f"\n✅ 文档已保存: {args.output}")
+    print(f"共 {len(items)} 个标签，{pages} 页")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签 PDF 直接输出 - 不经过 Word，生成即可打印
+- 三种版式与 docx 脚本相同：3 列条码表格、5×5 二维码栈板页、3×2 资源图 + 条码单元格
+- 条码 / 二维码由 barcode_encoder 编码后直接画成矢量矩形，任意缩放都清晰
+- 重复使用的图片（如资源图）只嵌入一次，所有单元格引用同一个图片对象
+- 页面内容写完即落盘（zlib 压缩），上千个标签几秒内生成，文件很小
+- 中文使用 PDF 阅读器内置的 STSong-Light（不嵌入字体）
+"""
+
+import argparse
+import hashlib
+import os
+import zlib
+
+from PIL import Image
+
+import barcode_encoder
+
+PT_PER_CM = 72 / 2.54
+A4 = (595.28, 841.89)
+MARGINS_CM = (1, 1.5, 1, 1.5)  # 上, 右, 下, 左（同 docx 脚本）
+
+DEFAULT_HEADER = ["COLOUR：WHITE", "MODEL：HF-01", "SKU/ITEM：", "QTY：25", "G.W.:  KG"]
+
+
+def cm(value):
+    return value * PT_PER_CM
+
+
+def _num(value):
+    """PDF 数字（去掉多余的 0）"""
+    text = f"{value:.3f}".rstrip('0').rstrip('.')
+    return text if text not in ('', '-0') else '0'
+
+
+# ==================== 页面内容 ====================
+
+class Page:
+    """
+    一页的绘图指令，坐标以左上角为原点、单位为 pt
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.height = writer.page_size[1]
+        self._ops = []
+
+    def _y(self, y):
+        return self.height - y
+
+    def rect(self, x, y, w, h, fill=True, line_width=0.5):
+        op = 'f' if fill else 'S'
+        prefix = '' if fill else f"{_num(line_width)} w "
+        self._ops.append(f"{prefix}{_num(x)} {_num(self._y(y + h))} {_num(w)} {_num(h)} re {op}")
+
+    def line(self, x1, y1, x2, y2, line_width=0.5):
+        self._ops.append(f"{_num(line_width)} w {_num(x1)} {_num(self._y(y1))} m "
+                         f"{_num(x2)} {_num(self._y(y2))} l S")
+
+    def grid(self, x, y, cols, rows, cell_w, cell_h, line_width=0.5):
+        """表格线（同 Word 的 Table Grid）"""
+        path = []
+        for c in range(cols + 1):
+            px = x + c * cell_w
+            path.append(f"{_num(px)} {_num(self._y(y))} m {_num(px)} {_num(self._y(y + rows * cell_h))} l")
+        for r in range(rows + 1):
+            py = self._y(y + r * cell_h)
+            path.append(f"{_num(x)} {_num(py)} m {_num(x + cols * cell_w)} {_num(py)} l")
+        self._ops.append(f"{_num(line_width)} w " + ' '.join(path) + ' S')
+
+    def text(self, x, y, text, size=10, font='cjk', align='left', bold=False, italic=False):
+        """
+        写一行文字，y 为基线位置
+
+        Args:
+            font: 'cjk'（宋体，中英文均可）或 'mono'（Courier，仅 ASCII）
+            align: 'left' | 'center' | 'right'（x 为对应的锚点）
+        """
+        width = text_width(text, size, font)
+        if align == 'center':
+            x -= width / 2
+        elif align == 'right':
+            x -= width
+        font_name, encoded = ('F2', _cjk_hex(text)) if font == 'cjk' else ('F1', _latin_literal(text))
+        matrix = f"1 0 {'0.2' if italic else '0'} 1 {_num(x)} {_num(self._y(y))} Tm"
+        mode = f"2 Tr {_num(size * 0.03)} w " if bold else ''
+        self._ops.append(f"BT {mode}/{font_name} {_num(size)} Tf {matrix} {encoded} Tj ET" + (' 0 Tr' if bold else ''))
+
+    def image(self, name, x, y, w, h):
+        self._ops.append(f"q {_num(w)} 0 0 {_num(h)} {_num(x)} {_num(self._y(y + h))} cm /{name} Do Q")
+
+    def barcode(self, data, x, y, w, h, symbology='code128', write_text=True, quiet=10):
+        """一维条码：每个条是一个矢量矩形，文字在条下方"""
+        runs = barcode_encoder.encode(data, symbology)
+        modules = sum(runs) + 2 * quiet
+        module = w / modules
+        label = barcode_encoder.human_text(data, symbology)
+        text_size = min(h * 0.16, w * 0.9 / (len(label) * 0.6)) if write_text else 0
+        bar_h = h - (text_size * 1.2 if write_text else 0)
+
+        bx = x + quiet * module
+        bars = []
+        for i, run in enumerate(runs):
+            if i % 2 == 0:
+                bars.append(f"{_num(bx)} {_num(self._y(y + bar_h))} {_num(run * module)} {_num(bar_h)} re")
+            bx += run * module
+        self._ops.append(' '.join(bars) + ' f')
+        if write_text:
+            self.text(x + w / 2, y + h - text_size * 0.2, label,
+                      size=text_size, font='mono', align='center')
+
+    def qr(self, data, x, y, size, border=0):
+        """二维码：每行连续的深色模块合并为一个矩形"""
+        matrix = barcode_encoder.qr_matrix(data, border=border)
+        n = len(matrix)
+        module = size / n
+        rects = []
+        for row_idx, row in enumerate(matrix):
+            col = 0
+            while col < n:
+                if row[col]:
+                    start = col
+                    while col < n and row[col]:
+                        col += 1
+                    rects.append(f"{_num(x + start * module)} {_num(self._y(y + (row_idx + 1) * module))} "
+                                 f"{_num((col - start) * module)} {_num(module)} re")
+                else:
+                    col += 1
+        self._ops.append(' '.join(rects) + ' f')
+
+    def content(self):
+        return '\n'.join(self._ops).encode('latin-1')
+
+
+def text_width(text, size, font='cjk'):
+    """估算文字宽度：Courier 每字 0.6em；宋体 ASCII 半角 0.5em、其余全角 1em"""
+    if font == 'mono':
+        return len(text) * size * 0.6
+    return sum(0.5 if ord(c) < 128 else 1.0 for c in text) * size
+
+
+def _cjk_hex(text):
+    return '<' + text.encode('utf-16-be').hex().upper() + '>'
+
+
+def _latin_literal(text):
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return '(' + escaped.encode('latin-1', 'replace').decode('latin-1') + ')'
+
+
+# ==================== PDF 写入 ====================
+
+class PdfWriter:
+    """
+    最小 PDF 写入器：对象顺序写入文件，只在内存中保留偏移表
+
+    用法：
+        with PdfWriter(path) as pdf:
+            page = pdf.new_page()
+            page.barcode("SN:5504AJML2644001", cm(1), cm(1), cm(5), cm(1.8))
+            pdf.add_page(page)
+    """
+
+    def __init__(self, path, page_size=A4):
+        self.path = path
+        self.page_size = page_size
+        self._f = open(path, 'wb')
+        self._f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._offsets = {}
+        self._next_id = 1
+        self._kids = []
+        self._xobjects = {}       # 名称 -> 对象号
+        self._images = {}         # 绝对路径 / 内容哈希 -> 名称
+
+        self._catalog_id = self._reserve()
+        self._pages_id = self._reserve()
+        self._resources_id = self._reserve()
+        self._fonts = {'F1': self._write_courier(), 'F2': self._write_cjk_font()}
+
+    # ---------- 对象 ----------
+
+    def _reserve(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body):
+        self._offsets[obj_id] = self._f.tell()
+        self._f.write(f"{obj_id} 0 obj\n".encode('latin-1'))
+        self._f.write(body if isinstance(body, bytes) else body.encode('latin-1'))
+        self._f.write(b"\nendobj\n")
+
+    def _write_stream(self, obj_id, entries, data, compress=True):
+        if compress:
+            data = zlib.compress(data)
+            entries += " /Filter /FlateDecode"
+        self._write_object(obj_id, f"<< {entries} /Length {len(data)} >>\nstream\n".encode('latin-1')
+                           + data + b"\nendstream")
+
+    def _write_courier(self):
+        obj_id = self._reserve()
+        self._write_object(obj_id, "<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        return obj_id
+
+    def _write_cjk_font(self):
+        """STSong-Light（Adobe-GB1，阅读器内置，不嵌入）"""
+        font_id, cid_id, desc_id = self._reserve(), self._reserve(), self._reserve()
+        self._write_object(desc_id, "<< /Type /FontDescriptor /FontName /STSong-Light /Flags 6 "
+                                    "/FontBBox [-25 -254 1000 880] /ItalicAngle 0 /Ascent 880 /Descent -120 "
+                                    "/CapHeight 880 /StemV 93 >>")
+        self._write_object(cid_id, "<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+                                   "/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> "
+                                   f"/FontDescriptor {desc_id} 0 R /DW 1000 /W [1 95 500] >>")
+        self._write_object(font_id, "<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light "
+                                    f"/Encoding /UniGB-UCS2-H /DescendantFonts [{cid_id} 0 R] >>")
+        return font_id
+
+    # ---------- 图片 ----------
+
+    def image(self, path):
+        """
+        登记图片（同一路径或相同内容只嵌入一次）
+
+        Returns:
+            (名称, 像素宽, 像素高)，名称用于 Page.image()
+        """
+        key = os.path.abspath(path)
+        found = self._images.get(key)
+        if found:
+            return found
+
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        found = self._images.get(digest)
+        if found is None:
+            found = self._embed_image(path)
+            self._images[digest] = found
+        self._images[key] = found
+        return found
+
+    def _embed_image(self, path):
+        img = Image.open(path)
+        if img.mode in ('RGBA', 'LA', 'P', 'PA') or 'transparency' in img.info:
+            # 透明部分按白底合成
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[3])
+        if img.mode == '1':
+            colorspace, bits = '/DeviceGray', 1
+        elif img.mode == 'L':
+            colorspace, bits = '/DeviceGray', 8
+        else:
+            img = img.convert('RGB')
+            colorspace, bits = '/DeviceRGB', 8
+
+        name = f"Im{len(self._xobjects) + 1}"
+        obj_id = self._reserve()
+        self._write_stream(obj_id, f"/Type /XObject /Subtype /Image /Width {img.width} /Height {img.height} "
+                                   f"/ColorSpace {colorspace} /BitsPerComponent {bits}", img.tobytes())
+        self._xobjects[name] = obj_id
+        return name, img.width, img.height
+
+    # ---------- 页面 ----------
+
+    def new_page(self):
+        return Page(self)
+
+    def add_page(self, page):
+        content_id, page_id = self._reserve(), self._reserve()
+        self._write_stream(content_id, "", page.content())
+        w, h = self.page_size
+        self._write_object(page_id, f"<< /Type /Page /Parent {self._pages_id} 0 R /MediaBox [0 0 {_num(w)} {_num(h)}] "
+                                    f"/Resources {self._resources_id} 0 R /Contents {content_id} 0 R >>")
+        self._kids.append(page_id)
+
+    @property
+    def page_count(self):
+        return len(self._kids)
+
+    def close(self):
+        if self._f.closed:
+            return
+        fonts = ' '.join(f"/{name} {obj_id} 0 R" for name, obj_id in self._fonts.items())
+        xobjects = ' '.join(f"/{name} {obj_id} 0 R" for name, obj_id in self._xobjects.items())
+        self._write_object(self._resources_id, f"<< /Font << {fonts} >> /XObject << {xobjects} >> "
+                                               "/ProcSet [/PDF /Text /ImageB /ImageC] >>")
+        kids = ' '.join(f"{k} 0 R" for k in self._kids)
+        self._write_object(self._pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>")
+        self._write_object(self._catalog_id, f"<< /Type /Catalog /Pages {self._pages_id} 0 R >>")
+
+        xref_offset = self._f.tell()
+        size = self._next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            lines.append(f"{self._offsets.get(obj_id, 0):010d} 00000 n \n")
+        self._f.write(''.join(lines).encode('latin-1'))
+        self._f.write(f"trailer\n<< /Size {size} /Root {self._catalog_id} 0 R >>\n"
+                      f"startxref\n{xref_offset}\n%%EOF\n".encode('latin-1'))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None:
+            # 出错时不留下半个文件
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        return False
+
+
+# ==================== 版式 ====================
+
+def _content_box(page_size):
+    top, right, bottom, left = (cm(v) for v in MARGINS_CM)
+    return left, top, page_size[0] - left - right, page_size[1] - top - bottom
+
+
+def barcode_table_pdf(sns, output_path, cols=3, per_table=25, symbology='code128'):
+    """
+    3 列条码表格（同 generate_barcode_tables）：每组一页，单元格 5.2×2cm，条码宽 5cm
+
+    Returns:
+        页数（含最后的统计页）
+    """
+    sns = list(sns)
+    cell_w, cell_h = cm(5.2), cm(2)
+    with PdfWriter(output_path) as pdf:
+        left, top, _, _ = _content_box(pdf.page_size)
+        groups = [sns[i:i + per_table] for i in range(0, len(sns), per_table)]
+        for group_num, group in enumerate(groups, 1):
+            page = pdf.new_page()
+            page.text(left, top + 12, f"【第 {group_num} 组】", size=12, bold=True)
+            table_y = top + cm(0.8)
+            rows = (len(group) + cols - 1) // cols
+            page.grid(left, table_y, cols, rows, cell_w, cell_h)
+            for i, sn in enumerate(group):
+                x = left + (i % cols) * cell_w + (cell_w - cm(5)) / 2
+                y = table_y + (i // cols) * cell_h + cm(0.15)
+                page.barcode(sn, x, y, cm(5), cell_h - cm(0.3), symbology)
+            pdf.add_page(page)
+
+        # 统计信息
+        page = pdf.new_page()
+        center = pdf.page_size[0] / 2
+        page.text(center, top + cm(1.5), f"总计: {len(sns)} 个条形码", size=14, align='center', bold=True)
+        page.text(center, top + cm(2.3), f"分 {len(groups)} 组，每组最多 {per_table} 个，{cols}列排列",
+                  size=11, align='center')
+        pdf.add_page(page)
+        return pdf.page_count
+
+
+def qr_pallet_pdf(sns, output_path, qty_per_page=25, header_lines=None):
+    """
+    栈板二维码页（同 generate_pallet_qrcode_doc）：上方标签信息 + 横线，下方 5 列二维码，
+    单元格 3×3cm，SN 末 5 位在上、二维码 2.2cm 在下，页脚页码
+
+    Returns:
+        页数
+    """
+    sns = list(sns)
+    header_lines = DEFAULT_HEADER if header_lines is None else header_lines
+    cols = 5
+    cell = cm(3)
+    pages = [sns[i:i + qty_per_page] for i in range(0, len(sns), qty_per_page)]
+    with PdfWriter(output_path) as pdf:
+        left, top, width, _ = _content_box(pdf.page_size)
+        table_x = left + (width - cols * cell) / 2
+        for page_num, items in enumerate(pages, 1):
+            page = pdf.new_page()
+            y = top
+            for line in header_lines:
+                y += 16
+                page.text(left, y, line, size=11, bold=True)
+            y += 10
+            page.line(left, y, left + width, y, line_width=1)
+            y += cm(0.5)
+
+            rows = (qty_per_page + cols - 1) // cols
+            page.grid(table_x, y, cols, rows, cell, cell)
+            for i, sn in enumerate(items):
+                cx = table_x + (i % cols) * cell
+                cy = y + (i // cols) * cell
+                page.text(cx + cell / 2, cy + cm(0.4), sn[-5:], size=8, align='center')
+                page.qr(sn, cx + (cell - cm(2.2)) / 2, cy + cm(0.6), cm(2.2))
+
+            first = (page_num - 1) * qty_per_page + 1
+            page.text(pdf.page_size[0] / 2, y + rows * cell + cm(1),
+                      f"第 {page_num} 页 / 共 {len(pages)} 页 | 本页: {first}-{first + len(items) - 1}",
+                      size=9, align='center', italic=True)
+            pdf.add_page(page)
+        return pdf.page_count
+
+
+def image_barcode_pdf(sns, output_path, image_path, symbology='code128'):
+    """
+    3×2 单元格（同 create_barcode_doc）：单元格 6×7cm，上方资源图、下方条码，宽均为 5cm；
+    资源图全文档只嵌入一次
+
+    Returns:
+        页数
+    """
+    sns = list(sns)
+    cols, rows = 2, 3
+    cell_w, cell_h = cm(6), cm(7)
+    inner_w = cm(5)
+    with PdfWriter(output_path) as pdf:
+        left, top, _, _ = _content_box(pdf.page_size)
+        name, px_w, px_h = pdf.image(image_path)
+        image_h = min(inner_w * px_h / px_w, cell_h * 0.55)
+        image_w = image_h * px_w / px_h
+        barcode_h = min(cm(2.5), cell_h - image_h - cm(0.8))
+
+        per_page = cols * rows
+        for start in range(0, len(sns), per_page):
+            page = pdf.new_page()
+            items = sns[start:start + per_page]
+            page.grid(left, top, cols, (len(items) + cols - 1) // cols, cell_w, cell_h)
+            for i, sn in enumerate(items):
+                x = left + (i % cols) * cell_w
+                y = top + (i // cols) * cell_h
+                page.image(name, x + (cell_w - image_w) / 2, y + cm(0.3), image_w, image_h)
+                page.barcode(sn, x + (cell_w - inner_w) / 2, y + cm(0.5) + image_h, inner_w, barcode_h, symbology)
+            pdf.add_page(page)
+        return pdf.page_count
+
+
+LAYOUTS = {
+    'table': "3 列条码表格，每组 25 个",
+    'qr': "5×5 二维码栈板页",
+    'cells': "3×2 资源图 + 条码单元格（需 --image）",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标签 PDF 直接输出")
+    parser.add_argument('layout', choices=sorted(LAYOUTS), help="版式: " + "；".join(f"{k} = {v}" for k, v in LAYOUTS.items()))
+    parser.add_argument('output', help="输出 PDF 路径")
+    parser.add_argument('--dir', help="SN 图片目录（按其中的 SN 生成）")
+    parser.add_argument('--prefix', default="SN:5504AJML", help="序列号前缀（配合 --start/--end）")
+    parser.add_argument('--start', type=int, help="起始编号")
+    parser.add_argument('--end', type=int, help="结束编号（包含）")
+    parser.add_argument('--image', help="cells 版式的资源图片")
+    args = parser.parse_args()
+
+    if args.dir:
+        from sn_index import load_index
+        sns = [item.sn for item in load_index(args.dir)]
+    elif args.start is not None and args.end is not None:
+        from batch_code_generator import iter_sequence
+        sns = list(iter_sequence(args.prefix, args.start, args.end))
+    else:
+        parser.error("需要 --dir 或 --start/--end")
+
+    import time
+    started = time.perf_counter()
+    if args.layout == 'table':
+        pages = barcode_table_pdf(sns, args.output)
+    elif args.layout == 'qr':
+        pages = qr_pallet_pdf(sns, args.output)
+    else:
+        if not args.image:
+            parser.error("cells 版式需要 --image")
+        pages = image_barcode_pdf(sns, args.output, args.image)
+    elapsed = time.perf_counter() - started
+    print(f"✅ 已生成: {args.output}")
+    print(f"共 {len(sns)} 个标签，{pages} 页，{os.path.getsize(args.output) / 1024:.1f} KB，耗时 {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,75 +2,175 @@
 # -*- coding: utf-8 -*-
 """
 记忆缓存系统 - 加速文件读取和响应
+- 每个缓存项记录源文件的 mtime / 大小，取值时 stat 一次校验，只重读变化的文件
+- 按最近使用（LRU）淘汰文件缓存项，总大小不超过字节预算；淘汰的项下次取值时重读
+- 延迟写入（write-behind）：改动只标记为脏，最多每 flush_interval 秒写一次磁盘，进程退出前补写
+- 磁盘上为 memory_snapshot 快照：启动时只 mmap 并读偏移表，各项第一次取值时才解码
 """
 
+import atexit
 import json
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 
+from memory_facts import facts_for_text, split_list, split_timezone
+from memory_snapshot import file_stamp, open_snapshot, read_source, write_snapshot
+
+WORKSPACE = "/root/.openclaw/workspace"
+CACHE_FILE = os.path.join(WORKSPACE, ".memory_cache.snap")
+
+# 缓存键 → 源文件
+SOURCES = {
+    'memory_md': os.path.join(WORKSPACE, 'MEMORY.md'),
+    'identity_md': os.path.join(WORKSPACE, 'IDENTITY.md'),
+    'user_md': os.path.join(WORKSPACE, 'USER.md'),
+    'soul_md': os.path.join(WORKSPACE, 'SOUL.md'),
+    'stock_config': os.path.join(WORKSPACE, 'stock_monitor_config.json'),
+}
+
+MAX_BYTES = 4 * 1024 * 1024
+FLUSH_INTERVAL = 30.0
+
 class MemoryCache:
-    """内存缓存管理器"""
+    """
+    内存缓存管理器
+    
+    缓存项分两种：
+    - 文件项（SOURCES 中的键）：带源文件的 mtime / 大小，取值时校验，可被 LRU 淘汰
+    - 自定义项（update() 写入的其他键）：没有源文件，不校验也不淘汰
+    """
     
-    def __init__(self):
-        self.cache_file = "/root/.openclaw/workspace/.memory_cache.json"
-        self.cache = {}
+    def __init__(self, cache_file=CACHE_FILE, sources=None, max_bytes=MAX_BYTES, flush_interval=FLUSH_INTERVAL):
+        self.cache_file = cache_file
+        self.sources = dict(SOURCES if sources is None else sources)
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        # 键 → {'value', 'stamp', 'bytes'}，按最近使用排序（最近的在末尾）；
+        # 从快照载入、还没取过值的项没有 'value'，取值时才从快照解码
+        self.entries = OrderedDict()
+        self.snapshot = None
+        self.total_bytes = 0
+        self.last_update = None
+        self.dirty = False
+        self._last_flush = time.monotonic()
         self.load_cache()
+        atexit.register(self.flush)
     
     def load_cache(self):
-        """从磁盘加载缓存"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    self.cache = json.load(f)
-            except:
-                self.cache = {}
-        else:
-            self.build_cache()
+        """映射磁盘上的快照（只读偏移表，值和是否过期都留到取值时处理）"""
+        snapshot = open_snapshot(self.cache_file)
+        if snapshot is None:
+            return
+        self.snapshot = snapshot
+        self.last_update = datetime.fromtimestamp(snapshot.mtime).isoformat()
+        for key in snapshot.keys():
+            size = snapshot.nbytes(key)
+            self.entries[key] = {'stamp': snapshot.stamp(key), 'bytes': size}
+            self.total_bytes += size
+        self._evict()
     
     def build_cache(self):
-        """构建初始缓存"""
-        self.cache = {
-            'memory_md': self._read_file('/root/.openclaw/workspace/MEMORY.md'),
-            'identity_md': self._read_file('/root/.openclaw/workspace/IDENTITY.md'),
-            'user_md': self._read_file('/root/.openclaw/workspace/USER.md'),
-            'soul_md': self._read_file('/root/.openclaw/workspace/SOUL.md'),
-            'stock_config': self._read_file('/root/.openclaw/workspace/stock_monitor_config.json'),
-            'last_update': datetime.now().isoformat(),
-            'version': 1
-        }
-        self.save_cache()
-    
-    def _read_file(self, path):
-        """安全读取文件"""
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except:
-            return ''
+        """重读全部源文件"""
+        for key in self.sources:
+            self._reload(key)
+        self._touch()
+        self.flush()
+    
+    def _store(self, key, value, stamp=None):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old['bytes']
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        size = len(text.encode('utf-8'))
+        self.entries[key] = {'value': value, 'stamp': stamp, 'bytes': size}
+        self.total_bytes += size
+    
+    def _reload(self, key):
+        """按源文件重读一个缓存项（先取 stamp 再读，读取期间文件变化下次会再读）"""
+        path = self.sources[key]
+        stamp = file_stamp(path)
+        value = read_source(path) if stamp is not None else ''
+        self._store(key, value, stamp)
+        self.dirty = True
+        return value
+    
+    def _evict(self):
+        """超出字节预算时淘汰最久未用的文件项"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in [k for k in self.entries if k in self.sources]:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.total_bytes -= self.entries.pop(key)['bytes']
+            self.dirty = True
+    
+    def _value(self, key, entry):
+        """缓存项的值（快照中的项第一次取值时解码）"""
+        if 'value' not in entry:
+            entry['value'] = self.snapshot.get(key)
+        return entry['value']
+    
+    def _touch(self):
+        self.last_update = datetime.now().isoformat()
+        self.dirty = True
     
     def save_cache(self):
-        """保存缓存到磁盘"""
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
-            json.dump(self.cache, f, ensure_ascii=False)
+        """立即保存缓存到磁盘"""
+        write_snapshot(self.cache_file, [(key, self._value(key, e), e['stamp']) for key, e in self.entries.items()])
+    
+    def flush(self):
+        """有未保存的改动时保存"""
+        if self.dirty:
+            try:
+                self.save_cache()
+            except OSError:
+                return
+            self.dirty = False
+        self._last_flush = time.monotonic()
+    
+    def maybe_flush(self):
+        """距上次保存已超过 flush_interval 秒时保存"""
+        if self.dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
     
     def get(self, key):
-        """获取缓存数据"""
-        return self.cache.get(key, '')
+        """获取缓存数据（文件项先 stat 校验，变化或已淘汰时重读）"""
+        entry = self.entries.get(key)
+        if key in self.sources:
+            if entry is None or entry['stamp'] != file_stamp(self.sources[key]):
+                value = self._reload(key)
+                self._touch()
+                self._evict()
+                self.maybe_flush()
+                return value
+        elif entry is None:
+            return ''
+        self.entries.move_to_end(key)
+        return self._value(key, entry)
     
     def update(self, key, value):
-        """更新缓存"""
-        self.cache[key] = value
-        self.cache['last_update'] = datetime.now().isoformat()
-        self.save_cache()
+        """更新缓存（延迟写入）"""
+        self._store(key, value, file_stamp(self.sources[key]) if key in self.sources else None)
+        self._touch()
+        self._evict()
+        self.maybe_flush()
     
     def refresh_if_needed(self):
-        """检查是否需要刷新（每10分钟）"""
-        try:
-            last = datetime.fromisoformat(self.cache.get('last_update', ''))
-            if (datetime.now() - last).seconds > 600:
-                self.build_cache()
-        except:
-            self.build_cache()
+        """
+        校验所有已缓存的文件项，只重读 mtime / 大小有变化的文件
+        返回: 重读的文件数
+        """
+        changed = [key for key, entry in self.entries.items()
+                   if key in self.sources and entry['stamp'] != file_stamp(self.sources[key])]
+        for key in changed:
+            self._reload(key)
+        if changed:
+            self._touch()
+            self._evict()
+        self.flush()
+        return len(changed)
 
 # 全局缓存实例
 _cache = None
@@ -83,38 +183,32 @@ def get_cache():
     return _cache
 
 def quick_memory():
-    """快速获取记忆摘要"""
+    """快速获取记忆摘要（从解析好的事实中取，MEMORY.md 没写的用默认值）"""
     cache = get_cache()
     
-    # 提取关键信息（避免读取整个文件）
-    memory = cache.get('memory_md')
-    lines = memory.split('\n')
+    # 同样内容只解析一次（memory_facts 按内容哈希缓存）
+    facts = facts_for_text(cache.get('memory_md'))
+    timezone, _ = split_timezone(facts.get('Timezone', section='我的用户'))
     
     summary = {
-        'user_name': '方逸灿',
-        'timezone': '东八区',
-        'markets': ['A股', '港股'],
+        'user_name': facts.get('Name', '方逸灿', section='我的用户'),
+        'timezone': timezone or '东八区',
+        'markets': split_list(facts.get('关注市场', section='我的用户')) or ['A股', '港股'],
         'features': ['股票监控', '自动备份']
     }
     
-    # 从缓存中快速提取
-    for line in lines:
-        if 'Name:' in line and '方逸灿' in line:
-            summary['user_name'] = '方逸灿'
-        elif 'Timezone:' in line and '东八区' in line:
-            summary['timezone'] = '东八区'
-    
     return summary
 
 if __name__ == '__main__':
     # 初始化缓存
     cache = get_cache()
+    reloaded = cache.refresh_if_needed()
     print("✅ 记忆缓存系统已初始化")
     print(f"📁 缓存文件: {cache.cache_file}")
-    print(f"🕐 最后更新: {cache.cache.get('last_update', '未知')}")
+    print(f"🕐 最后更新: {cache.last_update or '未知'}")
+    print(f"📦 缓存项: {len(cache.entries)} 个，{cache.total_bytes / 1024:.1f} KB / {cache.max_bytes / 1024:.0f} KB，本次重读 {reloaded} 个文件")
     
     # 测试快速读取
-    import time
     start = time.time()
     summary = quick_memory()
     elapsed = (time.time() - start) * 1000
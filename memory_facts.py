@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记忆事实解析 - 把 MEMORY.md / USER.md 解析成结构化的章节树，查事实不再扫原文
+- 章节：Markdown 标题，以及单独一行的粗体小标题（如 "**职业背景**"）
+- 事实：列表项 "- **Name:** 方逸灿"、"- **决策时间**: ..."、"- MBTI：INFP" → 键 / 值
+- 表格：表头 + 各行，解析成 [{列名: 值}, ...]
+- 同一内容只解析一次：按内容 SHA-1 缓存（进程内 + 磁盘），文件 mtime / 大小没变时连文件都不读
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from atomic_file import write_json_atomic
+
+WORKSPACE = "/root/.openclaw/workspace"
+FACTS_CACHE_FILE = os.path.join(WORKSPACE, ".memory_facts.json")
+CACHE_VERSION = 1
+# 磁盘缓存最多保留的解析结果数（不含各文件当前版本）
+MAX_CACHED_TREES = 16
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+LABEL_RE = re.compile(r'^\*\*([^*]+?)\*\*[:：]?\s*$')
+ITEM_RE = re.compile(r'^\s*(?:[-*+]|\d+\.)\s+(.*)$')
+BOLD_FACT_RE = re.compile(r'^\*\*(?P<key>[^*]+?)\s*(?P<colon>[:：])?\s*\*\*\s*(?(colon)|[:：])\s*(?P<value>.*)$')
+PLAIN_FACT_RE = re.compile(r'^(?P<key>[^\s:：*`\[][^:：`]{0,15}?)\s*[:：]\s*(?P<value>(?!//|\d+[:：]).+)$')
+TABLE_SEP_RE = re.compile(r'^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$')
+
+# 粗体小标题的层级（在所有 Markdown 标题之下）
+LABEL_LEVEL = 7
+
+# ==================== 解析 ====================
+
+def _new_section(title, level, line):
+    return {'title': title, 'level': level, 'line': line,
+            'facts': {}, 'items': [], 'tables': [], 'lines': [], 'children': []}
+
+def _clean(text):
+    return text.replace('**', '').strip()
+
+def _parse_fact(item):
+    """列表项 → (键, 值)；不是 "键: 值" 形式时返回 None"""
+    m = BOLD_FACT_RE.match(item) or PLAIN_FACT_RE.match(item)
+    if not m:
+        return None
+    return _clean(m.group('key')), _clean(m.group('value'))
+
+def _split_row(line):
+    cells = line.strip().strip('|').split('|')
+    return [_clean(cell) for cell in cells]
+
+def parse_markdown(text):
+    """
+    Markdown → 章节树（纯 dict，可直接写成 JSON）
+
+    每个章节：{'title', 'level', 'line', 'facts': {键: 值}, 'items': [列表项],
+              'tables': [[{列名: 值}, ...]], 'lines': [(行号, 原文)], 'children': [子章节]}
+    根章节的 level 为 0、title 为空
+    """
+    root = _new_section('', 0, 0)
+    stack = [root]
+    table = None  # 正在解析的表格：{'header': [...], 'rows': [...]} 或只有表头时的候选
+
+    lines = text.split('\n')
+    for number, raw in enumerate(lines, 1):
+        line = raw.strip()
+        section = stack[-1]
+
+        if table is not None and not line.startswith('|'):
+            table = None
+
+        m = HEADING_RE.match(line)
+        label = LABEL_RE.match(line) if not m else None
+        if m or label:
+            level = len(m.group(1)) if m else LABEL_LEVEL
+            title = _clean(m.group(2) if m else label.group(1))
+            while stack[-1]['level'] >= level:
+                stack.pop()
+            child = _new_section(title, level, number)
+            child['lines'].append((number, line))
+            stack[-1]['children'].append(child)
+            stack.append(child)
+            continue
+
+        if not line or line == '---':
+            continue
+        section['lines'].append((number, line))
+
+        if line.startswith('|'):
+            if table is None:
+                table = {'header': _split_row(line), 'rows': None}
+            elif table['rows'] is None:
+                if not TABLE_SEP_RE.match(line):
+                    table = {'header': _split_row(line), 'rows': None}
+                    continue
+                table['rows'] = []
+                section['tables'].append(table['rows'])
+            else:
+                table['rows'].append(dict(zip(table['header'], _split_row(line))))
+            continue
+
+        m = ITEM_RE.match(raw)
+        if m:
+            item = m.group(1).strip()
+            section['items'].append(_clean(item))
+            fact = _parse_fact(item)
+            if fact and fact[0]:
+                section['facts'].setdefault(fact[0], fact[1])
+    return root
+
+# ==================== 查询 ====================
+
+class MemoryFacts:
+    """
+    解析后的记忆文件
+
+    用法：
+        facts = load_facts("USER.md")
+        facts.get("Name")                          # '方逸灿'
+        facts.get("Name", section="我的用户")       # 只在标题含 "我的用户" 的章节（及其子章节）里找
+        facts.section("投资信息")["facts"]
+        facts.search("不.*markdown")               # 第一处匹配的 (章节标题, 行号, 原文)
+    """
+
+    def __init__(self, tree, digest=None):
+        self.tree = tree
+        self.digest = digest
+
+    def sections(self, tree=None):
+        """所有章节（文档顺序，含根章节）"""
+        stack = [tree or self.tree]
+        while stack:
+            section = stack.pop()
+            yield section
+            stack.extend(reversed(section['children']))
+
+    def section(self, title):
+        """第一个标题包含 title 的章节；找不到返回 None"""
+        for section in self.sections():
+            if title in section['title']:
+                return section
+        return None
+
+    def _scope(self, section):
+        if section is None:
+            return self.sections()
+        found = self.section(section)
+        return self.sections(found) if found is not None else iter(())
+
+    def get(self, key, default=None, section=None):
+        """第一个名为 key 的事实（不区分大小写）；section 限定章节标题"""
+        key = key.lower()
+        for s in self._scope(section):
+            for k, value in s['facts'].items():
+                if k.lower() == key:
+                    return value
+        return default
+
+    def facts(self, section=None):
+        """所有事实 {键: 值}，同名的取第一个"""
+        result = {}
+        for s in self._scope(section):
+            for k, value in s['facts'].items():
+                result.setdefault(k, value)
+        return result
+
+    def tables(self, section=None):
+        return [table for s in self._scope(section) for table in s['tables']]
+
+    def grep(self, pattern, flags=re.IGNORECASE, section=None):
+        """逐行匹配：[(章节标题, 行号, 原文), ...]"""
+        regex = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        return [(s['title'], number, line) for s in self._scope(section)
+                for number, line in s['lines'] if regex.search(line)]
+
+    def search(self, pattern, flags=re.IGNORECASE, section=None):
+        """第一处匹配的行：(章节标题, 行号, 原文)；没有时返回 None"""
+        regex = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        for s in self._scope(section):
+            for number, line in s['lines']:
+                if regex.search(line):
+                    return s['title'], number, line
+        return None
+
+# ==================== 缓存 ====================
+
+_parsed = {}       # 内容哈希 → MemoryFacts
+_disk = None       # 磁盘缓存（第一次用到时读入）
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+def _load_disk():
+    global _disk
+    if _disk is None:
+        try:
+            with open(FACTS_CACHE_FILE, 'r', encoding='utf-8') as f:
+                _disk = json.load(f)
+            if _disk.get('version') != CACHE_VERSION:
+                raise ValueError
+        except (OSError, ValueError, AttributeError):
+            _disk = {'version': CACHE_VERSION, 'files': {}, 'trees': {}}
+    return _disk
+
+def _save_disk():
+    """写回磁盘缓存（只保留各文件当前版本和最近的解析结果），写不了时忽略"""
+    disk = _load_disk()
+    keep = {entry['hash'] for entry in disk['files'].values()}
+    trees = disk['trees']
+    recent = [h for h in trees if h not in keep][-MAX_CACHED_TREES:]
+    disk['trees'] = {h: trees[h] for h in trees if h in keep or h in recent}
+    try:
+        write_json_atomic(FACTS_CACHE_FILE, disk)
+    except OSError:
+        pass
+
+def _facts_for_digest(digest, text_source):
+    """按内容哈希取解析结果：进程内 → 磁盘 → 解析（text_source() 返回原文）"""
+    facts = _parsed.get(digest)
+    if facts is not None:
+        return facts, False
+    disk = _load_disk()
+    tree = disk['trees'].get(digest)
+    stored = False
+    if tree is None:
+        tree = parse_markdown(text_source())
+        disk['trees'][digest] = tree
+        stored = True
+    facts = MemoryFacts(tree, digest)
+    _parsed[digest] = facts
+    return facts, stored
+
+def facts_for_text(text):
+    """解析一段 Markdown 原文（同样内容只解析一次）"""
+    facts, stored = _facts_for_digest(_digest(text.encode('utf-8')), lambda: text)
+    if stored:
+        _save_disk()
+    return facts
+
+def load_facts(path):
+    """
+    解析一个记忆文件；文件 mtime / 大小没变时直接用缓存，不读文件
+    文件不存在时返回空的 MemoryFacts
+    """
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return facts_for_text('')
+    stamp = [st.st_mtime_ns, st.st_size]
+
+    disk = _load_disk()
+    entry = disk['files'].get(path)
+    if entry is not None and entry['stamp'] == stamp and (entry['hash'] in _parsed or entry['hash'] in disk['trees']):
+        return _facts_for_digest(entry['hash'], None)[0]
+
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return facts_for_text('')
+    digest = _digest(data)
+    facts, _ = _facts_for_digest(digest, lambda: data.decode('utf-8', errors='replace'))
+    disk['files'][path] = {'stamp': stamp, 'hash': digest}
+    _save_disk()
+    return facts
+
+# ==================== 常用事实 ====================
+
+def split_timezone(value):
+    """'东八区 (Asia/Shanghai)' → ('东八区', 'Asia/Shanghai')；没有括号时两项相同"""
+    m = re.match(r'^(.*?)\s*[（(]\s*([^)）]+?)\s*[)）]\s*$', value or '')
+    if m:
+        return m.group(1), m.group(2)
+    return value, value
+
+def split_list(value):
+    """'A股 + 港股（港交所）' → ['A股', '港股']"""
+    value = re.sub(r'[（(][^)）]*[)）]', '', value or '')
+    return [part.strip() for part in re.split(r'[+＋、,，/]', value) if part.strip()]
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    paths = sys.argv[1:] or [os.path.join(WORKSPACE, 'USER.md'), os.path.join(WORKSPACE, 'MEMORY.md')]
+    for path in paths:
+        start = time.perf_counter()
+        facts = load_facts(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        all_facts = facts.facts()
+        sections = sum(1 for _ in facts.sections()) - 1
+        print(f"📄 {path}: {sections} 个章节，{len(all_facts)} 条事实（{elapsed:.2f}ms）")
+        for key, value in list(all_facts.items())[:15]:
+            print(f"   {key}: {value}")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记忆全文检索 - SQLite FTS5 + 中文二元分词
+- 索引 memory/*.md 和工作区根目录的 MEMORY.md、USER.md、IDENTITY.md 等 Markdown 文件
+- 按标题 / 段落切块入库，查询返回排序后的片段（bm25），毫秒级
+- 中文按相邻两字切词（"股票监控" → 股票 票监 监控），查询词按短语匹配，即原文中连续出现
+- 按文件 mtime / 大小增量更新：每次查询前只重建有变化的文件
+"""
+
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+WORKSPACE = os.path.dirname(os.path.abspath(__file__))
+INDEX_DB = os.path.join(WORKSPACE, ".memory_search.db")
+SCHEMA_VERSION = 1
+
+# 块的最大长度（字符）；超过时按空行继续切分
+CHUNK_CHARS = 800
+
+CJK = '㐀-䶿一-鿿豈-﫿'
+TOKEN_RE = re.compile(f'(?P<cjk>[{CJK}]+)|(?P<word>[^\\W{CJK}]+)')
+HEADING_RE = re.compile(r'^#{1,6}\s+(.*)$')
+
+SearchHit = namedtuple('SearchHit', 'path line heading snippet score')
+
+
+# ==================== 分词 ====================
+
+def tokenize(text):
+    """
+    切词：中文连续片段按相邻两字切分并补上末字，其余按单词（小写）
+    "查股票" → ['查股', '股票', '票']
+    """
+    tokens = []
+    for m in TOKEN_RE.finditer(text.lower()):
+        run = m.group('cjk')
+        if run:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(m.group('word'))
+    return tokens
+
+
+def _fts_term(term):
+    """单个查询词 → FTS5 表达式（短语要求原文连续出现；单个汉字用前缀匹配）"""
+    parts = []
+    for m in TOKEN_RE.finditer(term.lower()):
+        run = m.group('cjk')
+        if run and len(run) == 1:
+            parts.append(f'"{run}"*')
+        elif run:
+            parts.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        else:
+            parts.append('"' + m.group('word').replace('"', '""') + '"')
+    return ' '.join(parts)
+
+
+def build_query(query):
+    """空格分隔的多个词 → 同时包含所有词"""
+    terms = [_fts_term(term) for term in query.split()]
+    return ' AND '.join(f'({t})' for t in terms if t)
+
+
+# ==================== 切块 ====================
+
+def split_chunks(text):
+    """
+    按标题切块，过长的块再按空行切
+    返回: [(起始行号, 标题, 内容), ...]，行号从 1 开始
+    """
+    chunks = []
+    heading = ''
+    lines = []
+    start = 1
+
+    def flush():
+        if any(line.strip() for line in lines):
+            chunks.append((start, heading, '\n'.join(lines).strip('\n')))
+
+    for number, line in enumerate(text.split('\n'), 1):
+        m = HEADING_RE.match(line)
+        too_long = not line.strip() and sum(len(l) + 1 for l in lines) >= CHUNK_CHARS
+        if m or too_long:
+            flush()
+            lines, start = [], number
+            if m:
+                heading = m.group(1).strip()
+        lines.append(line)
+    flush()
+    return chunks
+
+
+# ==================== 索引 ====================
+
+def default_sources(root=WORKSPACE):
+    """要索引的文件：根目录的 *.md 和 memory/*.md"""
+    paths = []
+    for directory in (root, os.path.join(root, 'memory')):
+        try:
+            with os.scandir(directory) as it:
+                paths.extend(entry.path for entry in it if entry.name.endswith('.md') and entry.is_file())
+        except OSError:
+            continue
+    return sorted(paths)
+
+
+class MemorySearch:
+    """
+    记忆全文索引
+
+    用法：
+        index = MemorySearch()
+        for hit in index.search("股票 监控"):
+            print(hit.path, hit.line, hit.snippet)
+    """
+
+    def __init__(self, db_path=INDEX_DB, root=WORKSPACE, sources=None):
+        """
+        Args:
+            db_path: 索引数据库路径（':memory:' 为不落盘）
+            root: 工作区目录
+            sources: 要索引的文件列表，默认见 default_sources()
+        """
+        self.root = root
+        self.sources = sources
+        self.conn = sqlite3.connect(db_path)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.executescript('''
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS chunks;
+                DROP TABLE IF EXISTS chunks_fts;
+            ''')
+        self.conn.executescript(f'''
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+            CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, path TEXT, line INTEGER, heading TEXT, text TEXT);
+            CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(tokens, tokenize='unicode61');
+            PRAGMA user_version = {SCHEMA_VERSION};
+        ''')
+
+    def _remove(self, path):
+        self.conn.execute('DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE path = ?)', (path,))
+        self.conn.execute('DELETE FROM chunks WHERE path = ?', (path,))
+        self.conn.execute('DELETE FROM files WHERE path = ?', (path,))
+
+    def update(self):
+        """
+        增量更新：mtime 或大小变化的文件重建，已删除的文件移出索引
+
+        Returns:
+            更新的文件数
+        """
+        sources = self.sources if self.sources is not None else default_sources(self.root)
+        known = dict((path, (mtime_ns, size)) for path, mtime_ns, size in
+                     self.conn.execute('SELECT path, mtime_ns, size FROM files'))
+        changed = 0
+        with self.conn:
+            for path in sources:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                rel = os.path.relpath(path, self.root)
+                if known.pop(rel, None) == (st.st_mtime_ns, st.st_size):
+                    continue
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        text = f.read()
+                except OSError:
+                    continue
+                self._remove(rel)
+                for line, heading, content in split_chunks(text):
+                    cur = self.conn.execute('INSERT INTO chunks (path, line, heading, text) VALUES (?, ?, ?, ?)',
+                                            (rel, line, heading, content))
+                    self.conn.execute('INSERT INTO chunks_fts (rowid, tokens) VALUES (?, ?)',
+                                      (cur.lastrowid, ' '.join(tokenize(content))))
+                self.conn.execute('INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)',
+                                  (rel, st.st_mtime_ns, st.st_size))
+                changed += 1
+            for rel in known:
+                self._remove(rel)
+                changed += 1
+        return changed
+
+    def rebuild(self):
+        """清空后全部重建"""
+        with self.conn:
+            self.conn.execute('DELETE FROM chunks_fts')
+            self.conn.execute('DELETE FROM chunks')
+            self.conn.execute('DELETE FROM files')
+        return self.update()
+
+    def search(self, query, limit=10, path_prefix=None, refresh=True, context=40):
+        """
+        查询，所有词都出现的块按相关度排序
+
+        Args:
+            query: 空格分隔的查询词（中文词按原文连续匹配）
+            limit: 最多返回条数
+            path_prefix: 只查某些文件，如 'memory/' 或 'MEMORY.md'
+            refresh: 查询前先增量更新索引
+            context: 片段中命中词前后保留的字数
+
+        Returns:
+            [SearchHit(path, line, heading, snippet, score), ...]，score 越小越相关（bm25）
+        """
+        if refresh:
+            self.update()
+        match = build_query(query)
+        if not match:
+            return []
+        sql = ('SELECT c.path, c.line, c.heading, c.text, bm25(chunks_fts) AS score '
+               'FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid WHERE chunks_fts MATCH ?')
+        params = [match]
+        if path_prefix:
+            # 按字符比较前缀（LIKE 会把 % _ 当通配符）
+            sql += ' AND substr(c.path, 1, ?) = ?'
+            params.extend([len(path_prefix), path_prefix])
+        sql += ' ORDER BY score LIMIT ?'
+        params.append(limit)
+        terms = query.split()
+        return [SearchHit(path, line, heading, make_snippet(text, terms, context), score)
+                for path, line, heading, text, score in self.conn.execute(sql, params)]
+
+    def close(self):
+        self.conn.close()
+
+
+def make_snippet(text, terms, context=40, mark=('【', '】')):
+    """在原文中截取第一个命中词附近的片段，命中词用 mark 标出"""
+    flat = ' '.join(line.strip() for line in text.split('\n') if line.strip())
+    lower = flat.lower()
+    hits = [(lower.find(t.lower()), t) for t in terms]
+    hits = [(pos, t) for pos, t in hits if pos >= 0]
+    if not hits:
+        return flat[:context * 2] + ('…' if len(flat) > context * 2 else '')
+
+    pos = min(hits)[0]
+    start, end = max(0, pos - context), min(len(flat), pos + context * 2)
+    snippet = flat[start:end]
+    pattern = re.compile('|'.join(re.escape(t) for _, t in sorted(hits, key=lambda x: -len(x[1]))), re.I)
+    snippet = pattern.sub(lambda m: mark[0] + m.group(0) + mark[1], snippet)
+    return ('…' if start else '') + snippet + ('…' if end < len(flat) else '')
+
+
+# 进程内共用的索引
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = MemorySearch()
+    return _index
+
+
+def search(query, limit=10, path_prefix=None):
+    """查询记忆（见 MemorySearch.search）"""
+    return get_index().search(query, limit=limit, path_prefix=path_prefix)
+
+
+if __name__ == '__main__':
+    import sys
+
+    args = sys.argv[1:]
+    index = get_index()
+    if args[:1] == ['--rebuild']:
+        start = time.perf_counter()
+        count = index.rebuild()
+        print(f"✅ 已重建索引: {count} 个文件，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        args = args[1:]
+    if not args:
+        print("用法: python3 memory_search.py [--rebuild] 查询词 ...")
+        sys.exit(0)
+
+    start = time.perf_counter()
+    hits = index.search(' '.join(args))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"🔍 {' '.join(args)}: {len(hits)} 条结果（{elapsed:.2f}ms）")
+    for hit in hits:
+        heading = f" § {hit.heading}" if hit.heading else ''
+        print(f"\n📄 {hit.path}:{hit.line}{heading}  ({hit.score:.2f})")
+        print(f"   {hit.snippet}")
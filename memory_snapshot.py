@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动快照 - 一个二进制文件装下会话启动要用的全部数据
+- 文件头 + 偏移表 + 数据区：打开时 mmap 整个文件，只解析偏移表
+- 每一项第一次取值时才解码（UTF-8 文本或 JSON），没用到的项不花时间
+- 每项带源文件的 mtime / 大小，调用方据此判断是否过期
+- 原子写入（临时文件 + 改名），已映射旧快照的进程不受影响
+
+文件格式（小端）：
+    头部   magic(8) 项数(uint32)
+    偏移表 每项：数据偏移(uint64) 数据长度(uint64) mtime_ns(int64) 源大小(int64) 类型(uint8) 键长(uint16) 键(UTF-8)
+    数据区 各项数据依次排列
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from atomic_file import atomic_write
+
+MAGIC = b'OCSNAP01'
+HEADER = struct.Struct('<8sI')
+ENTRY = struct.Struct('<QQqqBH')
+
+KIND_TEXT = 0
+KIND_JSON = 1
+
+class Snapshot:
+    """
+    只读快照
+
+    用法：
+        snap = Snapshot(path)
+        snap.get('memory_md')      # 第一次取值时解码
+        snap.stamp('memory_md')    # [mtime_ns, 大小]，写入时无源文件为 None
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._decoded = {}
+        self._mm = None
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.mtime = st.st_mtime
+            if st.st_size == 0:
+                raise ValueError(f"空快照: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"不是快照文件: {path}")
+        pos = HEADER.size
+        for _ in range(count):
+            offset, length, mtime_ns, size, kind, key_len = ENTRY.unpack_from(self._mm, pos)
+            pos += ENTRY.size
+            key = self._mm[pos:pos + key_len].decode('utf-8')
+            pos += key_len
+            stamp = None if size < 0 else [mtime_ns, size]
+            self.index[key] = (offset, length, stamp, kind)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return list(self.index)
+
+    def stamp(self, key):
+        return self.index[key][2]
+
+    def nbytes(self, key):
+        """数据长度（编码后的字节数）"""
+        return self.index[key][1]
+
+    def get(self, key, default=None):
+        """取值（解码结果会记住）"""
+        if key in self._decoded:
+            return self._decoded[key]
+        entry = self.index.get(key)
+        if entry is None:
+            return default
+        offset, length, _, kind = entry
+        text = self._mm[offset:offset + length].decode('utf-8')
+        value = json.loads(text) if kind == KIND_JSON else text
+        self._decoded[key] = value
+        return value
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+def open_snapshot(path):
+    """打开快照；不存在或格式不对时返回 None"""
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def write_snapshot(path, entries):
+    """
+    写入快照
+
+    Args:
+        entries: [(键, 值, stamp), ...]；值为 str 时按文本存，其他按 JSON 存；stamp 为 [mtime_ns, 大小] 或 None
+    """
+    table = []
+    blobs = []
+    for key, value, stamp in entries:
+        if isinstance(value, str):
+            data, kind = value.encode('utf-8'), KIND_TEXT
+        else:
+            data, kind = json.dumps(value, ensure_ascii=False).encode('utf-8'), KIND_JSON
+        table.append((key.encode('utf-8'), stamp, kind, len(data)))
+        blobs.append(data)
+
+    offset = HEADER.size + sum(ENTRY.size + len(key) for key, _, _, _ in table)
+    parts = [HEADER.pack(MAGIC, len(table))]
+    for key, stamp, kind, length in table:
+        mtime_ns, size = stamp if stamp is not None else (-1, -1)
+        parts.append(ENTRY.pack(offset, length, mtime_ns, size, kind, len(key)))
+        parts.append(key)
+        offset += length
+    parts.extend(blobs)
+
+    with atomic_write(path, binary=True) as f:
+        f.write(b''.join(parts))
+
+def file_stamp(path):
+    """[mtime_ns, 大小]；文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def read_source(path):
+    """安全读取源文件"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return ''
+
+def snapshot_sources(path, sources):
+    """
+    按源文件（键 → 路径）写快照
+    返回: 写入的项数
+    """
+    entries = []
+    for key, source in sources.items():
+        stamp = file_stamp(source)
+        entries.append((key, read_source(source) if stamp is not None else '', stamp))
+    write_snapshot(path, entries)
+    return len(entries)
+
+def is_fresh(snapshot, sources):
+    """快照是否包含全部源文件且 mtime / 大小都没变"""
+    return all(key in snapshot and snapshot.stamp(key) == file_stamp(source) for key, source in sources.items())
+
+# ==================== 基准 ====================
+
+def _timed(fn, runs):
+    """多次运行取中位数，单位 ms"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def _session_start(code, runs):
+    """新 Python 进程执行 code 的耗时（含解释器启动），中位数 ms"""
+    import subprocess
+    import sys
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    return _timed(lambda: subprocess.run([sys.executable, '-c', code], cwd=here, check=True), runs)
+
+def benchmark(sources, work_dir, runs=200, process_runs=10):
+    """
+    启动耗时对比：逐个读源文件 / 解码整个 JSON 缓存 / 映射快照（只取一项 / 取全部）
+    返回: {名称: 中位数 ms}
+    """
+    json_path = os.path.join(work_dir, 'bench_cache.json')
+    snap_path = os.path.join(work_dir, 'bench_snapshot.bin')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({key: read_source(path) for key, path in sources.items()}, f, ensure_ascii=False)
+    snapshot_sources(snap_path, sources)
+    first = next(iter(sources))
+
+    def read_files():
+        return {key: read_source(path) for key, path in sources.items()}
+
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def snapshot_one():
+        snap = Snapshot(snap_path)
+        snap.get(first)
+        snap.close()
+
+    def snapshot_all():
+        snap = Snapshot(snap_path)
+        for key in snap.keys():
+            snap.get(key)
+        snap.close()
+
+    def snapshot_checked():
+        snap = Snapshot(snap_path)
+        is_fresh(snap, sources)
+        snap.get(first)
+        snap.close()
+
+    results = {
+        '逐个读源文件': _timed(read_files, runs),
+        '解码 JSON 缓存': _timed(load_json, runs),
+        '快照：取一项': _timed(snapshot_one, runs),
+        '快照：校验 + 取一项': _timed(snapshot_checked, runs),
+        '快照：取全部': _timed(snapshot_all, runs),
+    }
+    if process_runs:
+        results['新进程：python 启动'] = _session_start('pass', process_runs)
+        results['新进程：import preload'] = _session_start('import preload', process_runs)
+        results['新进程：quick_memory()'] = _session_start('import memory_cache; memory_cache.quick_memory()', process_runs)
+    return results
+
+if __name__ == '__main__':
+    import argparse
+
+    from preload import FILES_TO_PRELOAD
+
+    parser = argparse.ArgumentParser(description="启动快照基准")
+    parser.add_argument('--runs', type=int, default=200, help="进程内每项运行次数")
+    parser.add_argument('--process-runs', type=int, default=10, help="新进程每项运行次数（0 为不测）")
+    args = parser.parse_args()
+
+    sources = {key: path for key, path in FILES_TO_PRELOAD.items() if os.path.exists(path)}
+    if not sources:
+        # 工作区不在默认位置时用本目录的同名文件
+        here = os.path.dirname(os.path.abspath(__file__))
+        sources = {key: os.path.join(here, os.path.basename(path)) for key, path in FILES_TO_PRELOAD.items()}
+    total = sum(os.path.getsize(p) for p in sources.values() if os.path.exists(p))
+    print(f"📁 源文件: {len(sources)} 个，共 {total / 1024:.1f} KB")
+
+    with tempfile.TemporaryDirectory(prefix='snapshot_bench_') as work_dir:
+        results = benchmark(sources, work_dir, args.runs, args.process_runs)
+    for name, ms in results.items():
+        print(f"  {ms:>9.3f} ms  {name}")
@@ -2,55 +2,73 @@
 # -*- coding: utf-8 -*-
 """
 智能预加载系统 - 会话开始时自动加载常用数据
+- 常用文件打包成一个启动快照（memory_snapshot），导入时只 mmap 快照并读偏移表
+- 每个文件第一次 get_preloaded() 时才解码，会话用到多少付出多少
+- 源文件 mtime / 大小有变化时重建快照；快照不可用时退回直接读文件
 """
 
-import json
 import os
 
-# 预加载的数据缓存
+from memory_facts import facts_for_text, split_list, split_timezone
+from memory_snapshot import is_fresh, open_snapshot, read_source, snapshot_sources
+
+WORKSPACE = '/root/.openclaw/workspace'
+SNAPSHOT_FILE = os.path.join(WORKSPACE, '.preload_snapshot.bin')
+
+FILES_TO_PRELOAD = {
+    'memory': os.path.join(WORKSPACE, 'MEMORY.md'),
+    'identity': os.path.join(WORKSPACE, 'IDENTITY.md'),
+    'user': os.path.join(WORKSPACE, 'USER.md'),
+    'stock_config': os.path.join(WORKSPACE, 'stock_monitor_config.json'),
+}
+
+# 已解码的数据
 _PRELOADED = {}
+# 当前映射的快照
+_snapshot = None
 
 def preload_essentials():
-    """预加载关键数据到内存"""
-    global _PRELOADED
+    """映射启动快照（过期或不存在时先重建），返回可用的文件数"""
+    global _snapshot
     
-    files_to_preload = {
-        'memory': '/root/.openclaw/workspace/MEMORY.md',
-        'identity': '/root/.openclaw/workspace/IDENTITY.md',
-        'user': '/root/.openclaw/workspace/USER.md',
-        'stock_config': '/root/.openclaw/workspace/stock_monitor_config.json',
-    }
-    
-    for key, path in files_to_preload.items():
+    snapshot = open_snapshot(SNAPSHOT_FILE)
+    if snapshot is None or not is_fresh(snapshot, FILES_TO_PRELOAD):
+        if snapshot is not None:
+            snapshot.close()
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                _PRELOADED[key] = f.read()
-        except:
-            _PRELOADED[key] = ''
+            snapshot_sources(SNAPSHOT_FILE, FILES_TO_PRELOAD)
+        except OSError:
+            pass
+        snapshot = open_snapshot(SNAPSHOT_FILE)
     
-    return len(_PRELOADED)
+    if _snapshot is not None:
+        _snapshot.close()
+    _snapshot = snapshot
+    _PRELOADED.clear()
+    return len(FILES_TO_PRELOAD)
 
 def get_preloaded(key):
-    """获取预加载的数据"""
-    return _PRELOADED.get(key, '')
+    """获取预加载的数据（第一次访问时解码）"""
+    if key not in _PRELOADED:
+        if _snapshot is not None and key in _snapshot:
+            _PRELOADED[key] = _snapshot.get(key)
+        elif key in FILES_TO_PRELOAD:
+            _PRELOADED[key] = read_source(FILES_TO_PRELOAD[key])
+        else:
+            return ''
+    return _PRELOADED[key]
 
 def quick_user_info():
-    """快速获取用户信息"""
-    memory = get_preloaded('memory')
+    """快速获取用户信息（从解析好的事实中取，MEMORY.md 没写的用默认值）"""
+    facts = facts_for_text(get_preloaded('memory'))
+    _, timezone = split_timezone(facts.get('Timezone', section='我的用户'))
     
-    # 快速解析关键信息
     info = {
-        'name': '方逸灿',
-        'timezone': 'Asia/Shanghai',
-        'markets': ['A股', '港股']
+        'name': facts.get('Name', '方逸灿', section='我的用户'),
+        'timezone': timezone or 'Asia/Shanghai',
+        'markets': split_list(facts.get('关注市场', section='我的用户')) or ['A股', '港股']
     }
     
-    # 从内存中快速扫描
-    if '方逸灿' in memory:
-        info['name'] = '方逸灿'
-    if '东八区' in memory or 'Asia/Shanghai' in memory:
-        info['timezone'] = 'Asia/Shanghai'
-    
     return info
 
 # 会话启动时自动预加载
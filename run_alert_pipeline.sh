@@ -0,0 +1,11 @@
+#!/bin/bash
+# 监控预警总线执行脚本
+# 一个进程完成金价 + 股票的抓取、检测与飞书推送（替代逐条 grep [HAS_ALERT] 再发送）
+
+# 设置 PATH 确保能找到 openclaw 命令
+export PATH="/root/.nvm/versions/node/v22.22.0/bin:$PATH"
+
+cd /root/.openclaw/workspace
+
+# 传入 --loop 300 等参数即可常驻运行
+python3 alert_pipeline.py --sink openclaw "$@"
@@ -1,13 +1,20 @@
 #!/bin/bash
 # 话题检测脚本 - 由cron定期调用
+# 加 --daemon 参数时改为启动常驻守护进程（inotify 监视 memory/），此后 cron 调用的 check 会自动跳过
 
 REPO_DIR="/root/.openclaw/workspace"
 cd "$REPO_DIR"
 
+if [ "$1" = "--daemon" ]; then
+    echo "$(date '+%Y-%m-%d %H:%M:%S') - 启动话题检测守护进程"
+    nohup python3 "$REPO_DIR/topic_detector.py" watch >> "$REPO_DIR/topic_detector.log" 2>&1 &
+    exit 0
+fi
+
 echo "$(date '+%Y-%m-%d %H:%M:%S') - 运行话题检测器 (cron)"
 python3 "$REPO_DIR/topic_detector.py" check
 
 # 如果有强制备份文件，记录但不执行备份（备份由主脚本处理）
 if [ -f "$REPO_DIR/.force_backup_due_to_topics" ]; then
     echo "$(date '+%Y-%m-%d %H:%M:%S') - 检测到话题阈值已达到，等待下次备份执行"
-fi
\ No newline at end of file
+fi
@@ -41,6 +41,15 @@ DB_DIR = WORKSPACE / "db"
 # 确保目录存在
 REPORTS_DIR.mkdir(exist_ok=True)
 
+# 记忆事实解析（工作区的 memory_facts.py）；没有时退回直接扫原文
+# 工作区追加在搜索路径末尾，其中的同名模块不会遮住标准库和已安装的包
+if str(WORKSPACE) not in sys.path:
+    sys.path.append(str(WORKSPACE))
+try:
+    from memory_facts import facts_for_text
+except ImportError:
+    facts_for_text = None
+
 # 😈 毒舌老板点评模板（加强版）
 BOSS_COMMENTS = {
     "improved": [
@@ -393,8 +402,13 @@ def analyze_user_data(memories: dict, sessions: list, report_type: str = "daily"
     user_content = memories.get("USER.md", "")
     
     # 基本信息
-    name_match = re.search(r'\*\*Name:\*\*\s*(.+)', user_content)
-    analysis["basic_info"]["name"] = name_match.group(1).strip() if name_match else "用户"
+    if facts_for_text is not None:
+        memory_facts = facts_for_text(memory_content)
+        analysis["basic_info"]["name"] = facts_for_text(user_content).get("Name") or "用户"
+    else:
+        memory_facts = None
+        name_match = re.search(r'\*\*Name:\*\*\s*(.+)', user_content)
+        analysis["basic_info"]["name"] = name_match.group(1).strip() if name_match else "用户"
     
     # 性格特质分析
     trait_patterns = {
@@ -414,7 +428,13 @@ def analyze_user_data(memories: dict, sessions: list, report_type: str = "daily"
         score = 0
         evidence = []
         for keyword in keywords:
-            if re.search(keyword, memory_content, re.IGNORECASE):
+            if memory_facts is not None:
+                # 已解析的文件按行查一次：命中的那一行即证据
+                hit = memory_facts.search(keyword)
+                if hit:
+                    score += 1
+                    evidence.append(hit[2][:80])
+            elif re.search(keyword, memory_content, re.IGNORECASE):
                 score += 1
                 match = re.search(rf'.{{0,50}}{keyword}.{{0,100}}', memory_content, re.IGNORECASE)
                 if match:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SN 图片目录索引 - 一次扫描，多处复用
+- os.scandir 扫描一遍，文件名里的 SN 前缀和流水号只解析一次
+- 支持 "SN:5504AJML2644001.png" 和 batch_code_generator 输出的 "SN_5504AJML2644001.png"
+- 按 (前缀, 流水号) 排序，可按 SN 查找、按流水号区间查询
+- 同一进程内按目录 mtime 缓存，目录没有增删文件时不再重复扫描
+"""
+
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+SN_FILE_RE = re.compile(r'^SN[:_](?P<prefix>.*?)(?P<number>\d+)\.(?P<ext>[A-Za-z0-9]+)$')
+
+SNImage = namedtuple('SNImage', 'sn prefix number path')
+
+_cache = {}  # (绝对路径, 扩展名) -> SNIndex
+
+
+class SNIndex:
+    """
+    SN 图片索引
+
+    用法：
+        index = load_index(barcodes_dir)
+        for item in index:              # 按流水号排序
+            print(item.sn, item.path)
+        index.get("SN:5504AJML2644001")
+        index.range(2644001, 2644025)   # 流水号闭区间
+    """
+
+    def __init__(self, directory, ext='png'):
+        self.directory = os.path.abspath(directory)
+        self.ext = ext.lower()
+        self.mtime_ns = os.stat(self.directory).st_mtime_ns
+
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                m = SN_FILE_RE.match(entry.name)
+                if not m or m.group('ext').lower() != self.ext or not entry.is_file():
+                    continue
+                prefix = "SN:" + m.group('prefix')
+                entries.append(SNImage(prefix + m.group('number'), prefix, int(m.group('number')), entry.path))
+        entries.sort(key=lambda e: (e.prefix, e.number))
+
+        self.entries = entries
+        self._keys = [(e.prefix, e.number) for e in entries]
+        self._by_sn = {e.sn: e for e in entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, i):
+        return self.entries[i]
+
+    def get(self, sn):
+        """按完整 SN（如 "SN:5504AJML2644001"）查找，找不到返回 None"""
+        return self._by_sn.get(sn)
+
+    def prefixes(self):
+        """出现过的 SN 前缀（已排序）"""
+        return sorted({e.prefix for e in self.entries})
+
+    def range(self, start=None, end=None, prefix=None):
+        """
+        流水号在 [start, end] 内的图片（二分查找）
+
+        Args:
+            start / end: 流水号上下限，None 为不限
+            prefix: 只查某个前缀（如 "SN:5504AJML"），None 为所有前缀
+        """
+        result = []
+        for p in ([prefix] if prefix is not None else self.prefixes()):
+            lo = bisect_left(self._keys, (p, start if start is not None else -1))
+            hi = bisect_right(self._keys, (p, end if end is not None else float('inf')))
+            result.extend(self.entries[lo:hi])
+        return result
+
+
+def load_index(directory, ext='png'):
+    """取目录索引；目录 mtime 未变时直接复用上次扫描结果"""
+    key = (os.path.abspath(directory), ext.lower())
+    cached = _cache.get(key)
+    if cached is not None and cached.mtime_ns == os.stat(key[0]).st_mtime_ns:
+        return cached
+    index = SNIndex(directory, ext)
+    _cache[key] = index
+    return index
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "."
+    started = time.perf_counter()
+    index = load_index(target)
+    scanned = time.perf_counter() - started
+    started = time.perf_counter()
+    load_index(target)
+    cached = time.perf_counter() - started
+    print(f"目录: {index.directory}")
+    print(f"SN 图片: {len(index)} 个，前缀: {', '.join(index.prefixes()) or '无'}")
+    print(f"扫描 {scanned * 1000:.1f} ms，缓存命中 {cached * 1000:.3f} ms")
+    if index.entries:
+        print(f"范围: {index[0].sn} ~ {index[-1].sn}")
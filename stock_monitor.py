@@ -301,22 +301,26 @@ class StockMonitor:
         if 'error' in stock_data:
             return f"❌ 数据获取失败: {stock_data['error']}"
         
+        all_alerts = self.collect_alerts(stock_data)
+        
+        # 生成短线信号
+        short_signals = self.generate_short_term_signals(stock_data)
+        
+        # 构建报告
+        return self.build_report(stock_data, all_alerts, short_signals)
+    
+    def collect_alerts(self, stock_data):
+        """检查整个监控列表的预警，记录并保存提醒时间"""
         all_alerts = []
         
-        # 检查每只股票的预警
-        for stock_config in watchlist:
+        for stock_config in self.config.get('watchlist', []):
             alerts = self.check_alerts(stock_data, stock_config)
             for alert in alerts:
                 all_alerts.append(alert)
                 self.record_alert(alert['key'])
         
         self.save_history()
-        
-        # 生成短线信号
-        short_signals = self.generate_short_term_signals(stock_data)
-        
-        # 构建报告
-        return self.build_report(stock_data, all_alerts, short_signals)
+        return all_alerts
     
     def build_report(self, stock_data, alerts, short_signals):
         """构建监控报告"""
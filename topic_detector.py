@@ -3,17 +3,34 @@
 话题检测脚本 V2
 根据用户要求：一组连续对话中，某个话题关键词出现超过15次即为大的话题
 一组连续对话只产出一个话题，达到10个不同话题后自动触发备份
+守护模式（watch）：常驻监视 memory/（inotify，不可用时轮询），文件追加后立即分析
 """
 
+import codecs
+import contextlib
+import ctypes
+import ctypes.util
 import os
+import io
+import itertools
 import json
+import math
 import re
+import select
+import signal
+import struct
+import sys
 from datetime import datetime, timedelta
-from typing import Dict, List, Set, Tuple
+from typing import Callable, Dict, List, Set, Tuple
 import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_file import write_json_atomic
 
 REPO_DIR = os.path.dirname(os.path.abspath(__file__))
 TOPIC_TRACKER_FILE = os.path.join(REPO_DIR, ".topic_tracker_v2.json")
+TOPIC_INDEX_FILE = os.path.join(REPO_DIR, ".topic_df_index.json")
 FORCE_BACKUP_FILE = os.path.join(REPO_DIR, ".force_backup_due_to_topics")
 MEMORY_DIR = os.path.join(REPO_DIR, "memory")
 
@@ -37,6 +54,88 @@ for topic, keywords in TOPIC_KEYWORDS.items():
     for keyword in keywords:
         KEYWORD_TO_TOPIC[keyword.lower()] = topic
 
+# 关键词 -> 所属的全部话题（"管理"、"部署"、"算法" 等同时属于多个话题）
+KEYWORD_TOPICS = {}
+for topic, keywords in TOPIC_KEYWORDS.items():
+    for keyword in keywords:
+        topics = KEYWORD_TOPICS.setdefault(keyword.lower(), [])
+        if topic not in topics:
+            topics.append(topic)
+
+class KeywordMatcher:
+    """
+    Aho-Corasick 多模式匹配：所有关键词建成一个自动机，文本只扫描一遍
+    耗时与文本长度成正比，与关键词数量无关；重叠的关键词（如 "AI" 与 "生成式AI"）都会命中
+    - 失败指针预先展开成完整的转移表，扫描时每个字符只查一次表
+    - 不含关键词字符的片段由正则整段跳过，自动机只处理可能命中的片段
+    """
+    
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        goto = [{}]              # 状态 -> {字符: 下一状态}（字典树）
+        output = [()]            # 状态 -> 在此结束的关键词序号
+        for idx, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    output.append(())
+                state = nxt
+            output[state] += (idx,)
+        
+        # 按层（BFS）计算失败指针；失败状态的转移与输出并入当前状态，
+        # 得到完整转移表（表中没有的字符回到根）
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]], **goto[state])
+            for char, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(char, 0)
+                output[nxt] += output[fail[nxt]]
+                queue.append(nxt)
+        
+        self._delta = delta
+        self._output = output
+        alphabet = ''.join(sorted({char for keyword in self.keywords for char in keyword}))
+        self._spans = re.compile('[' + re.escape(alphabet) + ']+') if alphabet else None
+    
+    def iter_hits(self, text: str):
+        """逐个产出 (起始位置, 关键词序号)，按结束位置顺序"""
+        if self._spans is None:
+            return
+        delta, output, keywords = self._delta, self._output, self.keywords
+        for span in self._spans.finditer(text):
+            state = 0
+            for pos, char in enumerate(span.group(), span.start()):
+                state = delta[state].get(char, 0)
+                for idx in output[state]:
+                    yield pos - len(keywords[idx]) + 1, idx
+    
+    def matched(self, text: str) -> Set[int]:
+        """出现过的关键词序号（不记录位置，最快）"""
+        found = set()
+        if self._spans is None:
+            return found
+        delta, output = self._delta, self._output
+        for span in self._spans.findall(text):
+            state = 0
+            for char in span:
+                state = delta[state].get(char, 0)
+                if output[state]:
+                    found.update(output[state])
+        return found
+
+# 启动时构建一次，所有关键词共用（关键词已小写，匹配前文本也转小写）
+KEYWORD_MATCHER = KeywordMatcher(KEYWORD_TO_TOPIC)
+
+# 增量读取时保留上次末尾的字符数，使跨两次追加的关键词也能命中
+TAIL_CHARS = max(len(keyword) for keyword in KEYWORD_TO_TOPIC) - 1
+
 def load_topic_tracker() -> Dict:
     """加载话题追踪器数据"""
     # 首先检查是否存在旧的V1数据文件
@@ -53,9 +152,8 @@ def load_topic_tracker() -> Dict:
             # 迁移数据
             migrated_data = migrate_v1_to_v2(old_data)
             
-            # 保存新格式
-            with open(new_tracker_file, 'w', encoding='utf-8') as f:
-                json.dump(migrated_data, f, ensure_ascii=False, indent=2)
+            # 保存新格式（与平时保存同样原子写入、同样格式）
+            save_topic_tracker(migrated_data)
             
             print(f"数据迁移完成: {len(migrated_data['detected_topics'])} 个话题已导入")
             
@@ -78,6 +176,10 @@ def load_topic_tracker() -> Dict:
             print(f"加载追踪器失败: {e}")
     
     # 默认数据结构 V2
+    return default_tracker()
+
+def default_tracker() -> Dict:
+    """默认数据结构 V2"""
     return {
         "version": 2,
         "detected_topics": [],           # 已检测到的话题列表
@@ -88,10 +190,13 @@ def load_topic_tracker() -> Dict:
             "last_message_time": 0       # 最后一条消息时间
         },
         "threshold": 15,                 # 话题触发阈值（15次）
+        "scoring": "count",              # 话题判定方式：count = 关键词次数；tfidf = TF-IDF 得分
+        "score_threshold": 15.0,         # tfidf 方式的话题触发阈值
         "backup_threshold": 10,          # 备份触发阈值（10个话题）
         "last_reset_time": 0,
         "conversation_timeout": 1800,    # 对话组超时时间（秒）：30分钟
-        "last_checked_time": 0
+        "last_checked_time": 0,
+        "files": {}                      # 各记忆文件已读到的位置 {文件名: {inode, offset, size, mtime, tail}}
     }
 
 def migrate_v1_to_v2(old_data: Dict) -> Dict:
@@ -106,6 +211,9 @@ def migrate_v1_to_v2(old_data: Dict) -> Dict:
     # 确保话题列表唯一
     detected_topics = list(set(detected_topics))
     
+    # V1 没有读取位置：迁移时把现有记忆文件都记为已读到末尾，之后只统计新追加的内容
+    files = {os.path.basename(file_path): _eof_file_state(stat) for file_path, stat in list_memory_files()}
+    
     return {
         "version": 2,
         "detected_topics": detected_topics,
@@ -119,33 +227,98 @@ def migrate_v1_to_v2(old_data: Dict) -> Dict:
         "backup_threshold": 10,
         "last_reset_time": old_data.get("last_reset_time", 0),
         "conversation_timeout": 1800,
-        "last_checked_time": old_data.get("last_checked_time", 0)
+        "last_checked_time": old_data.get("last_checked_time", 0),
+        "files": files
     }
 
 def save_topic_tracker(data: Dict):
     """保存话题追踪器数据"""
-    with open(TOPIC_TRACKER_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json_atomic(TOPIC_TRACKER_FILE, data)
 
-def extract_keywords(text: str) -> List[str]:
-    """从文本中提取关键词（属于预定义话题的）"""
-    keywords_found = []
-    text_lower = text.lower()
+class TrackerStore:
+    """
+    话题追踪器的内存状态 + 延迟写入（write-behind）
+    - 普通消息只更新内存中的计数；检测到话题、对话组重置等状态变化时立即保存
+    - 其余改动最多每 flush_interval 秒保存一次，退出前 flush()
+    """
+    
+    def __init__(self, tracker: Dict = None, flush_interval: float = 30.0):
+        self.tracker = tracker if tracker is not None else load_topic_tracker()
+        self.flush_interval = flush_interval
+        self.dirty = False
+        self._last_flush = time.monotonic()
+    
+    def ingest(self, text: str, message_time: int, keyword_counts: Dict[str, int] = None) -> Tuple[bool, str]:
+        """处理一条消息（同 update_conversation_state），按需保存"""
+        start_time = self.tracker["current_conversation"]["start_time"]
+        detected, topic = update_conversation_state(self.tracker, text, message_time, keyword_counts)
+        self.dirty = True
+        if detected or self.tracker["current_conversation"]["start_time"] != start_time:
+            self.flush()
+        else:
+            self.maybe_flush()
+        return detected, topic
+    
+    def mark_dirty(self):
+        self.dirty = True
     
-    # 检查每个关键词是否在文本中
-    for keyword, topic in KEYWORD_TO_TOPIC.items():
-        if keyword in text_lower:
-            keywords_found.append(keyword)
+    def maybe_flush(self):
+        """距上次保存已超过 flush_interval 秒时保存"""
+        if self.dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
     
-    return keywords_found
+    def flush(self):
+        if self.dirty:
+            save_topic_tracker(self.tracker)
+            self.dirty = False
+        self._last_flush = time.monotonic()
 
-def update_conversation_state(tracker: Dict, text: str, message_time: int) -> Tuple[bool, str]:
+def find_keyword_hits(text: str) -> List[Tuple[int, str]]:
+    """
+    文本中所有关键词出现的位置
+    返回: [(起始位置, 关键词), ...]，位置为小写文本中的下标，关键词为小写形式
+    """
+    keywords = KEYWORD_MATCHER.keywords
+    return [(pos, keywords[idx]) for pos, idx in KEYWORD_MATCHER.iter_hits(text.lower())]
+
+def count_keywords(text: str) -> Dict[str, int]:
+    """每个关键词在文本中出现的次数（只含出现过的）"""
+    counts = {}
+    keywords = KEYWORD_MATCHER.keywords
+    for _, idx in KEYWORD_MATCHER.iter_hits(text.lower()):
+        keyword = keywords[idx]
+        counts[keyword] = counts.get(keyword, 0) + 1
+    return counts
+
+def extract_keywords(text: str) -> List[str]:
+    """从文本中提取关键词（属于预定义话题的），每个关键词一次，按 KEYWORD_TO_TOPIC 顺序"""
+    found = KEYWORD_MATCHER.matched(text.lower())
+    keywords = KEYWORD_MATCHER.keywords
+    return [keywords[idx] for idx in sorted(found)]
+
+def write_force_backup_file(message_time: int, topics: List[str]):
+    """创建触发备份的文件（备份由 auto_git_push.sh 执行）"""
+    with open(FORCE_BACKUP_FILE, 'w') as f:
+        f.write(f"话题数量达到阈值 {len(topics)}，触发备份")
+
+def update_conversation_state(tracker: Dict, text: str, message_time: int,
+                              keyword_counts: Dict[str, int] = None,
+                              on_backup: Callable[[int, List[str]], None] = write_force_backup_file,
+                              scorer: "TopicScorer" = None) -> Tuple[bool, str]:
     """
     更新对话状态并检查是否检测到新话题
+    keyword_counts: 已统计好的关键词出现次数（如增量读取的新内容）；不传时文本中每个关键词计一次
+    on_backup: 达到备份阈值时调用 on_backup(消息时间, 本轮话题列表)，默认写入强制备份文件
+    scorer: tfidf 方式使用的打分器，默认为进程内共用的 get_topic_scorer()
     返回: (是否检测到话题, 检测到的话题)
     """
     current = tracker["current_conversation"]
     threshold = tracker["threshold"]
+    use_scores = tracker.get("scoring") == "tfidf"
+    # 计数用 Counter（从 JSON 加载的是普通 dict）
+    for key in ("keyword_counts", "topic_counts") + (("topic_scores",) if use_scores else ()):
+        if not isinstance(current.get(key), Counter):
+            current[key] = Counter(current.get(key, {}))
     
     # 检查对话组是否超时（30分钟无消息）
     if current["last_message_time"] > 0:
@@ -154,8 +327,11 @@ def update_conversation_state(tracker: Dict, text: str, message_time: int) -> Tu
             # 对话组超时，重置当前对话
             print(f"对话组超时（{time_since_last}秒），重置")
             current["start_time"] = message_time
-            current["keyword_counts"] = {}
-            current["topic_counts"] = {}
+            current["keyword_counts"] = Counter()
+            current["topic_counts"] = Counter()
+            current.pop("topic_scores", None)
+            if use_scores:
+                current["topic_scores"] = Counter()
     
     # 如果是新对话组，设置开始时间
     if current["start_time"] == 0:
@@ -165,23 +341,32 @@ def update_conversation_state(tracker: Dict, text: str, message_time: int) -> Tu
     current["last_message_time"] = message_time
     
     # 提取关键词并更新计数
-    keywords = extract_keywords(text)
-    for keyword in keywords:
-        # 更新关键词计数
-        current["keyword_counts"][keyword] = current["keyword_counts"].get(keyword, 0) + 1
-        
-        # 获取该关键词所属的话题类别
+    if keyword_counts is None:
+        keyword_counts = {keyword: 1 for keyword in extract_keywords(text)}
+    current["keyword_counts"].update(keyword_counts)
+    topic_counts = current["topic_counts"]
+    for keyword, count in keyword_counts.items():
+        # 按关键词所属的话题类别累计
         topic = KEYWORD_TO_TOPIC.get(keyword)
         if topic:
-            # 更新话题类别计数
-            current["topic_counts"][topic] = current["topic_counts"].get(topic, 0) + 1
+            topic_counts[topic] += count
     
     # 检查是否有话题达到阈值
     detected_topic = None
-    for topic, count in current["topic_counts"].items():
-        if count >= threshold:
-            detected_topic = topic
-            break
+    if use_scores:
+        # TF-IDF：常见关键词权重低，跨话题的关键词按话题数平分
+        topic_scores = current["topic_scores"]
+        topic_scores.update((scorer if scorer is not None else get_topic_scorer()).score(keyword_counts))
+        score_threshold = tracker.get("score_threshold", float(threshold))
+        for topic, score in topic_scores.items():
+            if score >= score_threshold:
+                detected_topic = topic
+                break
+    else:
+        for topic, count in current["topic_counts"].items():
+            if count >= threshold:
+                detected_topic = topic
+                break
     
     if detected_topic:
         # 记录话题
@@ -190,16 +375,17 @@ def update_conversation_state(tracker: Dict, text: str, message_time: int) -> Tu
         
         # 重置当前对话组（开始新的对话组）
         current["start_time"] = message_time
-        current["keyword_counts"] = {}
-        current["topic_counts"] = {}
+        current["keyword_counts"] = Counter()
+        current["topic_counts"] = Counter()
+        current.pop("topic_scores", None)
+        if use_scores:
+            current["topic_scores"] = Counter()
         current["last_message_time"] = message_time
         
         # 检查是否达到备份阈值
         if len(tracker["detected_topics"]) >= tracker["backup_threshold"]:
             print(f"检测到第{len(tracker['detected_topics'])}个话题，达到备份阈值{tracker['backup_threshold']}")
-            # 创建触发备份的文件
-            with open(FORCE_BACKUP_FILE, 'w') as f:
-                f.write(f"话题数量达到阈值 {len(tracker['detected_topics'])}，触发备份")
+            on_backup(message_time, list(tracker["detected_topics"]))
             
             # 重置检测到的话题列表（开始新一轮计数）
             tracker["detected_topics"] = []
@@ -209,82 +395,568 @@ def update_conversation_state(tracker: Dict, text: str, message_time: int) -> Tu
     
     return False, ""
 
-def analyze_latest_memory():
-    """分析最新的记忆文件，更新话题状态"""
-    latest_file = get_latest_memory_file()
-    if not latest_file:
-        print("未找到记忆文件")
-        return
+def read_appended(file_path: str, file_state: Dict, stat: os.stat_result) -> Tuple[str, Dict[str, int]]:
+    """
+    读取文件上次位置之后追加的内容
+    inode 变化或文件变短（被替换 / 截断）时从头读；末尾不完整的 UTF-8 字符留到下次
+    返回: (新内容, 新内容中关键词出现次数)，并就地更新 file_state
+    """
+    offset = file_state.get("offset", 0)
+    tail = file_state.get("tail", "")
+    if file_state.get("inode") != stat.st_ino or stat.st_size < offset:
+        offset, tail = 0, ""
     
-    # 获取文件修改时间作为消息时间
-    try:
-        file_mtime = os.path.getmtime(latest_file)
-    except OSError:
-        file_mtime = int(time.time())
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
     
-    # 读取文件内容
-    try:
-        with open(latest_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except (IOError, UnicodeDecodeError) as e:
-        print(f"读取记忆文件失败: {e}")
-        return
-    
-    # 只分析最近的内容（最后2000字符）
-    recent_content = content[-2000:]
-    if not recent_content.strip():
-        print("记忆文件内容为空")
-        return
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    text = decoder.decode(data)
+    pending = len(decoder.getstate()[0])
     
-    # 加载追踪器
-    tracker = load_topic_tracker()
+    # 上次末尾的几个字符接在前面一起匹配，只统计结束在新内容里的关键词
+    counts = {}
+    for pos, keyword in find_keyword_hits(tail + text):
+        if pos + len(keyword) > len(tail):
+            counts[keyword] = counts.get(keyword, 0) + 1
     
-    # 检查是否已经分析过该文件
+    file_state.update({
+        "inode": stat.st_ino,
+        "offset": offset + len(data) - pending,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "tail": (tail + text)[-TAIL_CHARS:] if TAIL_CHARS else "",
+    })
+    return text, counts
+
+def _seed_file_offsets(tracker: Dict, memory_files: List[Tuple[str, os.stat_result]]):
+    """旧版追踪器没有读取位置：上次检查前已修改过的文件视为已读完，避免重新计数"""
     last_checked = tracker.get("last_checked_time", 0)
-    if file_mtime <= last_checked:
-        print(f"文件已分析过（最后检查: {datetime.fromtimestamp(last_checked)})")
-        return
+    files = tracker["files"]
+    for file_path, stat in memory_files:
+        if last_checked and stat.st_mtime <= last_checked:
+            files[os.path.basename(file_path)] = _eof_file_state(stat)
+
+def _eof_file_state(stat: os.stat_result) -> Dict:
+    """读取位置记在文件末尾（视为已读完）"""
+    return {"inode": stat.st_ino, "offset": stat.st_size, "size": stat.st_size, "mtime": stat.st_mtime, "tail": ""}
+
+def list_memory_files() -> List[Tuple[str, os.stat_result]]:
+    """所有记忆文件及其 stat，按修改时间从旧到新"""
+    if not os.path.exists(MEMORY_DIR):
+        return []
+    
+    md_files = []
+    with os.scandir(MEMORY_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.md') and entry.is_file():
+                try:
+                    md_files.append((entry.path, entry.stat()))
+                except OSError:
+                    continue
+    md_files.sort(key=lambda x: x[1].st_mtime)
+    return md_files
+
+def analyze_memory_files(store: TrackerStore) -> int:
+    """
+    分析所有有变化的记忆文件（更新 store 中的追踪器，保存时机由 store 决定）
+    每个文件只读上次之后追加的字节，关键词按实际出现次数计入，不重复、不遗漏
+    返回: 有新内容的文件数
+    """
+    tracker = store.tracker
+    memory_files = list_memory_files()
+    if "files" not in tracker:
+        tracker["files"] = {}
+        _seed_file_offsets(tracker, memory_files)
+    files = tracker["files"]
     
-    # 更新对话状态
-    detected, topic = update_conversation_state(tracker, recent_content, int(file_mtime))
+    # TF-IDF 方式先更新文档频率（只读新增字节）
+    if tracker.get("scoring") == "tfidf":
+        scorer = get_topic_scorer()
+        scorer.update(memory_files)
+        scorer.save()
     
-    if detected:
-        print(f"{datetime.fromtimestamp(file_mtime).strftime('%Y-%m-%d %H:%M:%S')} - 检测到新话题: {topic}")
-        print(f"已检测话题数: {len(tracker['detected_topics'])}/{tracker['backup_threshold']}")
+    analyzed = 0
+    for file_path, stat in memory_files:
+        name = os.path.basename(file_path)
+        file_state = files.setdefault(name, {})
+        # 大小、修改时间、inode 都没变的文件不打开
+        if (file_state.get("inode") == stat.st_ino and file_state.get("size") == stat.st_size
+                and file_state.get("mtime") == stat.st_mtime):
+            continue
+        
+        try:
+            text, counts = read_appended(file_path, file_state, stat)
+        except OSError as e:
+            print(f"读取记忆文件失败: {name}: {e}")
+            continue
+        store.mark_dirty()
+        if not text.strip():
+            continue
+        analyzed += 1
+        
+        # 用文件修改时间作为消息时间
+        detected, topic = store.ingest(text, int(stat.st_mtime), keyword_counts=counts)
+        if detected:
+            print(f"{datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')} - 检测到新话题: {topic}")
+            print(f"已检测话题数: {len(tracker['detected_topics'])}/{tracker['backup_threshold']}")
+    
+    # 已删除的文件不再追踪
+    existing = {os.path.basename(path) for path, _ in memory_files}
+    for name in [name for name in files if name not in existing]:
+        del files[name]
+        store.mark_dirty()
     
     # 更新最后检查时间
     tracker["last_checked_time"] = int(time.time())
+    return analyzed
+
+def analyze_latest_memory():
+    """分析所有有变化的记忆文件，更新并保存话题状态（cron 调用的 check）"""
+    if not list_memory_files():
+        print("未找到记忆文件")
+        return
     
-    # 保存追踪器
-    save_topic_tracker(tracker)
+    # 守护进程在运行时由它处理，避免两边同时改追踪器
+    pid = running_daemon_pid()
+    if pid:
+        print(f"话题检测守护进程运行中（PID {pid}），跳过")
+        return
+    
+    store = TrackerStore()
+    if not analyze_memory_files(store):
+        print("记忆文件没有新内容")
+    # 记录本次检查时间
+    store.mark_dirty()
+    store.flush()
 
 def get_latest_memory_file() -> str:
     """获取最新的记忆文件"""
-    if not os.path.exists(MEMORY_DIR):
-        return ""
+    md_files = list_memory_files()
+    return md_files[-1][0] if md_files else ""
+
+# ==================== TF-IDF 话题打分 ====================
+
+class TopicScorer:
+    """
+    话题 TF-IDF 打分
+    - 以 memory/ 下每个文件为一篇文档，记录每篇包含哪些关键词，得到关键词的文档频率（DF）
+    - 索引存于 .topic_df_index.json，文件追加时只读新增字节、只更新变化文件的 DF
+    - 打分：每个关键词 (1 + ln 次数) × IDF，跨多个话题的关键词按话题数平分
+    """
     
-    md_files = []
-    for file in os.listdir(MEMORY_DIR):
-        if file.endswith('.md'):
-            file_path = os.path.join(MEMORY_DIR, file)
+    VERSION = 1
+    
+    def __init__(self, index_file: str = None, persist: bool = True):
+        """persist=False 时为纯内存打分器：不加载索引，save() 不写文件"""
+        self.index_file = index_file or TOPIC_INDEX_FILE
+        self.persist = persist
+        self.docs = {}           # 文件名 -> 读取位置（同 tracker 的 files）+ keywords
+        self.df = Counter()      # 关键词 -> 包含它的文件数
+        self.dirty = False
+        if not persist:
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.docs = data["docs"]
+                self.df = Counter(data["df"])
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    def update(self, memory_files: List[Tuple[str, os.stat_result]] = None) -> int:
+        """增量更新文档频率，返回有变化的文件数"""
+        if memory_files is None:
+            memory_files = list_memory_files()
+        changed = 0
+        for file_path, stat in memory_files:
+            name = os.path.basename(file_path)
+            doc = self.docs.setdefault(name, {})
+            if (doc.get("inode") == stat.st_ino and doc.get("size") == stat.st_size
+                    and doc.get("mtime") == stat.st_mtime):
+                continue
+            # 文件被替换 / 截断时从头读，关键词集合重新计算
+            restarted = doc.get("inode") != stat.st_ino or stat.st_size < doc.get("offset", 0)
+            old_keywords = set(doc.get("keywords", ()))
             try:
-                md_files.append((file_path, os.path.getmtime(file_path)))
+                _, counts = read_appended(file_path, doc, stat)
             except OSError:
                 continue
+            keywords = set(counts) if restarted else old_keywords | set(counts)
+            self.df.subtract(old_keywords - keywords)
+            self.df.update(keywords - old_keywords)
+            doc["keywords"] = sorted(keywords)
+            changed += 1
+        
+        existing = {os.path.basename(path) for path, _ in memory_files}
+        for name in [name for name in self.docs if name not in existing]:
+            self.df.subtract(self.docs.pop(name).get("keywords", ()))
+            changed += 1
+        if changed:
+            self.df = +self.df    # 去掉计数为 0 的关键词
+            self.dirty = True
+        return changed
+    
+    def add_keywords(self, name: str, keywords) -> None:
+        """把关键词并入文档 name（回放时按消息逐条累积 DF，只用到当时已出现的内容）"""
+        doc = self.docs.setdefault(name, {})
+        old_keywords = set(doc.get("keywords", ()))
+        new_keywords = set(keywords) - old_keywords
+        if new_keywords:
+            self.df.update(new_keywords)
+            doc["keywords"] = sorted(old_keywords | new_keywords)
     
-    if not md_files:
-        return ""
+    def save(self):
+        if self.persist and self.dirty:
+            write_json_atomic(self.index_file, {"version": self.VERSION, "docs": self.docs, "df": self.df})
+            self.dirty = False
     
-    # 按修改时间排序，获取最新的文件
-    md_files.sort(key=lambda x: x[1], reverse=True)
-    return md_files[0][0]
+    def idf(self, keyword: str) -> float:
+        """平滑 IDF：ln((1 + N) / (1 + df)) + 1，没出现过的关键词权重最高"""
+        return math.log((1 + len(self.docs)) / (1 + self.df.get(keyword, 0))) + 1
+    
+    def score(self, keyword_counts: Dict[str, int]) -> Counter:
+        """按关键词次数给各话题打分"""
+        scores = Counter()
+        for keyword, count in keyword_counts.items():
+            topics = KEYWORD_TOPICS.get(keyword)
+            if not topics or count <= 0:
+                continue
+            weight = (1 + math.log(count)) * self.idf(keyword) / len(topics)
+            for topic in topics:
+                scores[topic] += weight
+        return scores
+    
+    def score_text(self, text: str) -> Counter:
+        """文本只扫描一遍（见 KeywordMatcher），返回各话题得分"""
+        return self.score(count_keywords(text))
+
+_topic_scorer = None
+
+def get_topic_scorer() -> TopicScorer:
+    """进程内共用的打分器，首次使用时加载索引并补上 memory/ 的变化"""
+    global _topic_scorer
+    if _topic_scorer is None:
+        _topic_scorer = TopicScorer()
+        _topic_scorer.update()
+        _topic_scorer.save()
+    return _topic_scorer
+
+# ==================== 历史回放 ====================
+
+SECTION_RE = re.compile(r'^#{1,3} ', re.M)
+SECTION_TIME_RE = re.compile(r'(?:(\d{4})-(\d{2})-(\d{2})[ T])?\b(\d{1,2}):(\d{2})(?!\d)')
+FILE_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+REPLAY_PARAMS = ("threshold", "backup_threshold", "conversation_timeout", "scoring", "score_threshold")
+
+def _file_base_time(file_path: str, stat: os.stat_result) -> datetime:
+    """文件名中的日期（如 2026-03-10.md）当天零点，没有日期时用修改时间"""
+    m = FILE_DATE_RE.search(os.path.basename(file_path))
+    if m:
+        try:
+            return datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(stat.st_mtime)
+
+def load_memory_messages() -> List[Tuple[int, Dict[str, int], str]]:
+    """
+    把全部记忆文件切成按时间排序的消息：[(时间戳, 关键词次数, 文件名), ...]
+    - 文件按文件名日期（没有则按修改时间）排序，每个标题（# / ## / ###）下的内容为一条消息
+    - 消息时间取段落中第一个 "HH:MM"（可带日期），没有时间的段落记为上一条之后 1 分钟，时间只增不减
+    - 关键词只统计一次，所有参数组共用
+    """
+    files = [(path, stat, _file_base_time(path, stat)) for path, stat in list_memory_files()]
+    files.sort(key=lambda x: (x[2], x[0]))
+    
+    messages = []
+    previous = 0
+    for file_path, stat, base in files:
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError:
+            continue
+        previous = max(previous, int(base.timestamp()))
+        starts = [m.start() for m in SECTION_RE.finditer(content)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        for start, end in zip(starts, starts[1:] + [len(content)]):
+            section = content[start:end]
+            if not section.strip():
+                continue
+            message_time = previous + 60
+            for m in SECTION_TIME_RE.finditer(section):
+                hour, minute = int(m.group(4)), int(m.group(5))
+                if hour < 24 and minute < 60:
+                    day = (datetime(int(m.group(1)), int(m.group(2)), int(m.group(3))) if m.group(1) else base)
+                    message_time = int(day.replace(hour=hour, minute=minute).timestamp())
+                    break
+            previous = max(previous, message_time)
+            messages.append((previous, count_keywords(section), os.path.basename(file_path)))
+    return messages
+
+def _replay_one(job: Tuple[Dict, List[Tuple[int, Dict[str, int], str]]]) -> Dict:
+    """
+    用一组参数回放全部消息（只在内存中，不写追踪器、强制备份文件和 DF 索引）
+    tfidf 方式使用本组私有的内存打分器，DF 随回放逐条累积，每条消息只按它之前（含自身）的内容打分
+    """
+    params, messages = job
+    tracker = default_tracker()
+    tracker.update(params)
+    scorer = TopicScorer(persist=False)
+    topics, backups = [], []
+    
+    def record_backup(message_time, round_topics):
+        backups.append({"time": message_time, "topics": round_topics})
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        for message_time, counts, name in messages:
+            scorer.add_keywords(name, counts)
+            detected, topic = update_conversation_state(tracker, "", message_time, keyword_counts=counts,
+                                                        on_backup=record_backup, scorer=scorer)
+            if detected:
+                topics.append({"time": message_time, "topic": topic})
+    return {"params": params, "topics": topics, "backups": backups}
+
+def replay_history(param_sets: List[Dict], workers: int = None) -> List[Dict]:
+    """
+    按时间顺序把全部记忆文件回放给多组参数，返回每组参数检测到的话题和触发备份的时间
+    参数组多时用多进程并行；回放不修改追踪器和 DF 索引，也不会创建强制备份文件
+    """
+    messages = load_memory_messages()
+    jobs = [(params, messages) for params in param_sets]
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        return [_replay_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_replay_one, jobs))
+
+def parse_param_grid(args: List[str]) -> List[Dict]:
+    """
+    "threshold=10,15,20 backup_threshold=5,10" -> 各参数取值的全部组合
+    未给出的参数使用默认值
+    """
+    grid = []
+    for arg in args:
+        name, _, values = arg.partition('=')
+        if name not in REPLAY_PARAMS or not values:
+            raise ValueError(f"无法识别的回放参数: {arg}（可用: {', '.join(REPLAY_PARAMS)}）")
+        parsed = []
+        for value in values.split(','):
+            if name == "scoring":
+                parsed.append(value)
+            elif name == "score_threshold":
+                parsed.append(float(value))
+            else:
+                parsed.append(int(value))
+        grid.append([(name, value) for value in parsed])
+    return [dict(combo) for combo in itertools.product(*grid)] or [{}]
+
+def show_replay(results: List[Dict], detail: bool = False):
+    """打印回放结果"""
+    def fmt(ts):
+        return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+    
+    print(f"=== 话题回放（{len(results)} 组参数）===")
+    for result in results:
+        params = result["params"]
+        label = ", ".join(f"{k}={v}" for k, v in params.items()) or "默认参数"
+        backups = result["backups"]
+        first = f"，首次 {fmt(backups[0]['time'])}" if backups else ""
+        print(f"{label}: 话题 {len(result['topics'])} 次，备份 {len(backups)} 次{first}")
+        if detail:
+            for event in result["topics"]:
+                print(f"    {fmt(event['time'])}  话题: {event['topic']}")
+            for event in backups:
+                print(f"    {fmt(event['time'])}  触发备份: {', '.join(event['topics'])}")
+
+# ==================== 守护进程 ====================
+
+DAEMON_PID_FILE = os.path.join(REPO_DIR, ".topic_detector.pid")
+
+# inotify 事件（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """用 inotify 监视目录（通过 ctypes 调用 libc，无需第三方库）；不可用时构造失败抛出 OSError"""
+    
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name or not sys.platform.startswith('linux'):
+            raise OSError("当前系统不支持 inotify")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("libc 没有 inotify")
+        
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        mask = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                | IN_DELETE_SELF | IN_MOVE_SELF)
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"无法监视目录: {directory}")
+        self.gone = False  # 被监视的目录本身已删除 / 移走
+    
+    def wait(self, timeout: float) -> bool:
+        """等待 .md 文件变化，返回是否有变化（超时返回 False）"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        data = os.read(self.fd, 64 * 1024)
+        changed = False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + name_len].rstrip(b'\0')
+            offset += INOTIFY_EVENT.size + name_len
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self.gone = True
+            if mask & IN_Q_OVERFLOW or name.endswith(b'.md'):
+                changed = True
+        return changed
+    
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """轮询目录中 .md 文件的 (inode, 大小, 修改时间)，inotify 不可用时使用"""
+    
+    def __init__(self, directory: str, interval: float = 5.0):
+        self.directory = directory
+        self.interval = interval
+        self.gone = False
+        self._signature = self._scan()
+    
+    def _scan(self):
+        return {os.path.basename(path): (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                for path, stat in list_memory_files()}
+    
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            signature = self._scan()
+            if signature != self._signature:
+                self._signature = signature
+                return True
+            if time.monotonic() >= deadline:
+                return False
+    
+    def close(self):
+        pass
+
+def running_daemon_pid() -> int:
+    """正在运行的守护进程 PID，没有则返回 0"""
+    try:
+        with open(DAEMON_PID_FILE, 'r') as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+    if pid <= 0 or pid == os.getpid():
+        return 0
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return 0
+    except PermissionError:
+        pass
+    return pid
+
+def make_watcher(use_polling: bool = False, poll_interval: float = 5.0):
+    """优先 inotify，不可用（非 Linux、目录不存在等）时退回轮询"""
+    if not use_polling:
+        try:
+            return InotifyWatcher(MEMORY_DIR)
+        except OSError as e:
+            print(f"inotify 不可用（{e}），改为每 {poll_interval:g} 秒轮询")
+    return PollingWatcher(MEMORY_DIR, poll_interval)
+
+def watch_memory(use_polling: bool = False, poll_interval: float = 5.0, debounce: float = 1.0,
+                 flush_interval: float = 30.0, max_wait: float = 10.0):
+    """
+    守护模式：常驻监视 memory/，文件追加后立即分析，达到阈值时立即写入强制备份标记
+    追踪器只在启动时加载一次，状态变化时立即保存，其余改动最多每 flush_interval 秒保存一次
+    
+    Args:
+        use_polling: 不用 inotify，直接轮询
+        poll_interval: 轮询间隔（秒）
+        debounce: 收到变化后再等这么久，把连续写入合并为一次分析
+        max_wait: 合并等待的上限（秒）：文件一直在写时，距第一次变化这么久后也要分析
+        flush_interval: 延迟写入的最长间隔（秒）
+    """
+    pid = running_daemon_pid()
+    if pid:
+        print(f"话题检测守护进程已在运行（PID {pid}）")
+        return
+    with open(DAEMON_PID_FILE, 'w') as f:
+        f.write(str(os.getpid()))
+    
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    
+    store = TrackerStore(flush_interval=flush_interval)
+    watcher = make_watcher(use_polling, poll_interval)
+    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - 话题检测守护进程启动（PID {os.getpid()}，"
+          f"{'inotify' if isinstance(watcher, InotifyWatcher) else '轮询'}）: {MEMORY_DIR}")
+    
+    try:
+        # 启动时先补上停机期间的追加
+        changed = True
+        while not stopping:
+            if changed:
+                # 合并短时间内的连续写入，但最多等 max_wait 秒，持续写入时不会一直推迟分析
+                first = time.monotonic()
+                while not stopping:
+                    remaining = max_wait - (time.monotonic() - first)
+                    if remaining <= 0 or not watcher.wait(min(debounce, remaining)):
+                        break
+                analyze_memory_files(store)
+            store.maybe_flush()
+            if watcher.gone or not os.path.isdir(MEMORY_DIR) and isinstance(watcher, InotifyWatcher):
+                # 目录被删除 / 替换后重新建立监视
+                watcher.close()
+                time.sleep(poll_interval)
+                watcher = make_watcher(use_polling, poll_interval)
+                changed = True
+                continue
+            changed = watcher.wait(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        store.flush()
+        if running_daemon_pid() == 0:
+            try:
+                os.remove(DAEMON_PID_FILE)
+            except OSError:
+                pass
+        print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - 话题检测守护进程退出")
 
 def show_topic_status():
     """显示话题状态"""
     tracker = load_topic_tracker()
     
     print(f"=== 话题检测状态 V2 ===")
-    print(f"检测阈值: {tracker['threshold']}次/话题")
+    if tracker.get("scoring") == "tfidf":
+        print(f"检测方式: TF-IDF 得分，阈值 {tracker.get('score_threshold', tracker['threshold'])}")
+    else:
+        print(f"检测阈值: {tracker['threshold']}次/话题")
     print(f"备份阈值: {tracker['backup_threshold']}个话题")
     print(f"已检测话题数: {len(tracker['detected_topics'])}/{tracker['backup_threshold']}")
     print(f"已检测话题: {', '.join(tracker['detected_topics']) if tracker['detected_topics'] else '无'}")
@@ -297,6 +969,10 @@ def show_topic_status():
         print(f"  话题计数:")
         for topic, count in sorted(current["topic_counts"].items(), key=lambda x: x[1], reverse=True):
             print(f"    {topic}: {count}/{tracker['threshold']}")
+        if current.get("topic_scores"):
+            print(f"  话题得分 (TF-IDF):")
+            for topic, score in sorted(current["topic_scores"].items(), key=lambda x: x[1], reverse=True):
+                print(f"    {topic}: {score:.2f}/{tracker.get('score_threshold', tracker['threshold'])}")
         
         if current["keyword_counts"]:
             print(f"  关键词计数 (TOP 5):")
@@ -343,8 +1019,6 @@ def test_keyword_extraction():
         print()
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1:
         command = sys.argv[1]
         if command == "check":
@@ -355,8 +1029,49 @@ if __name__ == "__main__":
             show_topic_status()
         elif command == "test":
             test_keyword_extraction()
+        elif command == "index":
+            # 更新文档频率索引并显示
+            scorer = get_topic_scorer()
+            print(f"索引文档数: {len(scorer.docs)}，关键词: {len(scorer.df)}")
+            for keyword, df in scorer.df.most_common(10):
+                print(f"  {keyword}: df={df} idf={scorer.idf(keyword):.2f}")
+        elif command == "score":
+            # 给一段文本（默认最新记忆文件）打分
+            if len(sys.argv) > 2:
+                text = " ".join(sys.argv[2:])
+            else:
+                latest = get_latest_memory_file()
+                with open(latest, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            for topic, score in get_topic_scorer().score_text(text).most_common():
+                print(f"  {topic}: {score:.2f}")
+        elif command == "scoring" and len(sys.argv) > 2 and sys.argv[2] in ("count", "tfidf"):
+            # 切换话题判定方式
+            tracker = load_topic_tracker()
+            tracker["scoring"] = sys.argv[2]
+            if len(sys.argv) > 3:
+                tracker["score_threshold"] = float(sys.argv[3])
+            save_topic_tracker(tracker)
+            print(f"话题判定方式: {tracker['scoring']}")
+        elif command == "replay":
+            # 回放历史：python3 topic_detector.py replay threshold=10,15 backup_threshold=5,10 [--detail] [--json 文件]
+            args = [a for a in sys.argv[2:] if not a.startswith("--")]
+            json_path = sys.argv[sys.argv.index("--json") + 1] if "--json" in sys.argv[2:-1] else None
+            if json_path:
+                args.remove(json_path)
+            results = replay_history(parse_param_grid(args))
+            show_replay(results, detail="--detail" in sys.argv)
+            if json_path:
+                with open(json_path, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, ensure_ascii=False, indent=2)
+                print(f"结果已保存: {json_path}")
+        elif command == "watch":
+            # 守护模式，输出通常重定向到日志，逐行刷新
+            sys.stdout.reconfigure(line_buffering=True)
+            watch_memory(use_polling="--poll" in sys.argv[2:])
         else:
-            print("用法: python3 topic_detector_v2.py [check|reset|status|test]")
+            print("用法: python3 topic_detector_v2.py [check|reset|status|test|watch [--poll]|index|score [文本]|"
+                  "scoring count|tfidf [阈值]|replay 参数=值,值 ... [--detail] [--json 文件]]")
     else:
         # 默认执行检查
         analyze_latest_memory()
\ No newline at end of file